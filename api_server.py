@@ -0,0 +1,251 @@
+"""
+Luminlex HTTP API
+
+与 Streamlit 页面共用同一个题目生成器、题目库和平台限流器的轻量异步服务。
+
+运行：
+    uvicorn api_server:app --host 0.0.0.0 --port 8600
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import msgspec
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from luminlex.question_generator import get_question_generator
+from luminlex.question_store import question_store
+
+# 同时进行的生成数上限（生成是阻塞调用，在线程池中执行）
+MAX_CONCURRENCY = int(os.environ.get("LUMINLEX_API_CONCURRENCY", "16"))
+# 单次请求允许生成的最大题目数
+MAX_SET_SIZE = int(os.environ.get("LUMINLEX_API_MAX_SET_SIZE", "100"))
+# 健康检查和题目库读取使用的线程数（与生成分开，生成占满线程池时仍能及时响应）
+LOOKUP_WORKERS = int(os.environ.get("LUMINLEX_API_LOOKUP_WORKERS", "4"))
+
+_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="api-generate")
+_lookup_executor = ThreadPoolExecutor(max_workers=LOOKUP_WORKERS, thread_name_prefix="api-lookup")
+_semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+
+class GenerateRequest(msgspec.Struct, forbid_unknown_fields=True):
+    """单题生成请求"""
+    exam_type: str
+    question_type: str
+    subtype: str
+    difficulty: str = "medium"
+    topic: Optional[str] = None
+    word_count: Optional[int] = None
+
+
+class QuestionSetRequest(msgspec.Struct, forbid_unknown_fields=True):
+    """题目集生成请求（reuse 为 False 时不复用题目库中的题目，exclude_ids 为不应出现的题目）"""
+    exam_type: str
+    question_types: List[str]
+    count_per_type: int = 5
+    difficulty: str = "medium"
+    topic: Optional[str] = None
+    target_time: Optional[float] = None
+    exclude_ids: List[str] = []
+    reuse: bool = True
+
+
+_encoder = msgspec.json.Encoder()
+
+
+def _json(data, status_code: int = 200) -> Response:
+    return Response(_encoder.encode(data), status_code=status_code, media_type="application/json")
+
+
+def _error(message: str, status_code: int) -> Response:
+    return _json({"error": message}, status_code)
+
+
+def _validate_choices(exam_type: str, question_types: List[str], difficulty: str, subtype: Optional[str] = None) -> Optional[str]:
+    """检查参数是否为生成器支持的取值，返回错误信息"""
+    generator = get_question_generator()
+    if exam_type not in generator.exam_types:
+        return f"不支持的考试类型: {exam_type}"
+    if difficulty not in generator.difficulty_levels:
+        return f"不支持的难度: {difficulty}"
+    for qtype in question_types:
+        if qtype not in generator.question_types:
+            return f"不支持的题目类型: {qtype}"
+    if subtype is not None and subtype not in generator.question_types[question_types[0]]["subtypes"]:
+        return f"不支持的子类型: {subtype}"
+    return None
+
+
+async def _run_generation(**params):
+    """在线程池中生成一道题目，受全局并发上限约束"""
+    async with _semaphore:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _executor,
+            lambda: get_question_generator().generate_question(**params)
+        )
+
+
+async def _run_batch(plan, batch):
+    """在线程池中生成题目集规划中的一组题目（一次平台请求），受全局并发上限约束"""
+    async with _semaphore:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _executor,
+            lambda: get_question_generator().generate_batch(plan, batch)
+        )
+
+
+async def _run_blocking(fn):
+    """在单独的线程池中执行阻塞调用（平台探测、题目库读取），不阻塞事件循环，也不排在生成之后"""
+    return await asyncio.get_running_loop().run_in_executor(_lookup_executor, fn)
+
+
+async def health(request: Request) -> Response:
+    platforms, stored = await _run_blocking(
+        lambda: (list(get_question_generator().available_platforms.keys()), len(question_store))
+    )
+    return _json({
+        "status": "ok",
+        "platforms": platforms,
+        "stored_questions": stored
+    })
+
+
+async def generate_question(request: Request) -> Response:
+    try:
+        body = msgspec.json.decode(await request.body(), type=GenerateRequest)
+    except msgspec.ValidationError as e:
+        return _error(str(e), 422)
+    except msgspec.DecodeError as e:
+        return _error(f"无效的JSON: {e}", 400)
+
+    error = _validate_choices(body.exam_type, [body.question_type], body.difficulty, body.subtype)
+    if error:
+        return _error(error, 422)
+
+    question = await _run_generation(
+        exam_type=body.exam_type,
+        question_type=body.question_type,
+        subtype=body.subtype,
+        difficulty=body.difficulty,
+        topic=body.topic,
+        word_count=body.word_count
+    )
+    return _json(question)
+
+
+async def generate_question_set(request: Request) -> Response:
+    try:
+        body = msgspec.json.decode(await request.body(), type=QuestionSetRequest)
+    except msgspec.ValidationError as e:
+        return _error(str(e), 422)
+    except msgspec.DecodeError as e:
+        return _error(f"无效的JSON: {e}", 400)
+
+    if not body.question_types:
+        return _error("question_types 不能为空", 422)
+    error = _validate_choices(body.exam_type, body.question_types, body.difficulty)
+    if error:
+        return _error(error, 422)
+    if not 0 < body.count_per_type * len(body.question_types) <= MAX_SET_SIZE:
+        return _error(f"题目总数必须在 1 到 {MAX_SET_SIZE} 之间", 422)
+    if body.target_time is not None and body.target_time <= 0:
+        return _error("target_time 必须大于 0", 422)
+
+    # 先用题目库中已有的题目填充，剩下的位置按参数分组，每组一次平台请求
+    generator = get_question_generator()
+    plan = await _run_blocking(
+        lambda: generator.plan_question_set(
+            body.exam_type, body.question_types, body.count_per_type, body.difficulty, body.topic,
+            target_time=body.target_time, exclude_ids=body.exclude_ids, reuse=body.reuse
+        )
+    )
+    reused = plan.questions()
+
+    async def generate(batch):
+        questions = await _run_batch(plan, batch)
+        plan.fill(batch, questions)
+        return questions
+
+    tasks = [asyncio.ensure_future(generate(batch)) for batch in plan.batches(generator.set_batch_size)]
+
+    stream = request.query_params.get("stream")
+    if stream is None and "text/event-stream" in request.headers.get("accept", ""):
+        stream = "sse"
+    elif stream is None and "application/x-ndjson" in request.headers.get("accept", ""):
+        stream = "ndjson"
+
+    if stream not in ("sse", "ndjson"):
+        await asyncio.gather(*tasks)
+        question_set = generator.new_question_set(body.exam_type, body.difficulty, body.topic)
+        question_set.questions = plan.questions()
+        question_set.summary = generator.summarize_set(question_set.questions, body.question_types, body.difficulty,
+                                                       reused=plan.reused_count)
+        return _json(question_set)
+
+    async def events():
+        # 复用的题目立即输出，生成的题目按完成顺序逐条输出，最后输出摘要
+        questions = list(reused)
+        try:
+            for question in reused:
+                yield _frame(stream, "question", question)
+            for done in asyncio.as_completed(tasks):
+                for question in await done:
+                    questions.append(question)
+                    yield _frame(stream, "question", question)
+            summary = generator.summarize_set(questions, body.question_types, body.difficulty,
+                                              reused=len(reused))
+            yield _frame(stream, "summary", summary)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    media_type = "text/event-stream" if stream == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type)
+
+
+def _frame(stream: str, event: str, data) -> bytes:
+    """按流格式封装一条消息"""
+    if stream == "sse":
+        return b"event: " + event.encode() + b"\ndata: " + _encoder.encode(data) + b"\n\n"
+    return _encoder.encode({"event": event, "data": data}) + b"\n"
+
+
+async def get_question(request: Request) -> Response:
+    question_id = request.path_params["question_id"]
+    question = await _run_blocking(lambda: question_store.get(question_id))
+    if question is None:
+        return _error("题目不存在", 404)
+    return _json(question)
+
+
+async def find_questions(request: Request) -> Response:
+    params = request.query_params
+    try:
+        limit = min(int(params.get("limit", "20")), MAX_SET_SIZE)
+    except ValueError:
+        return _error("limit 必须是整数", 422)
+    if limit < 1:
+        return _error("limit 必须大于 0", 422)
+    questions = await _run_blocking(lambda: question_store.find(
+        exam_type=params.get("exam_type"),
+        question_type=params.get("question_type"),
+        subtype=params.get("subtype"),
+        difficulty=params.get("difficulty"),
+        limit=limit
+    ))
+    return _json({"questions": questions, "count": len(questions)})
+
+
+app = Starlette(routes=[
+    Route("/health", health, methods=["GET"]),
+    Route("/v1/questions", generate_question, methods=["POST"]),
+    Route("/v1/questions", find_questions, methods=["GET"]),
+    Route("/v1/questions/{question_id}", get_question, methods=["GET"]),
+    Route("/v1/question-sets", generate_question_set, methods=["POST"]),
+])
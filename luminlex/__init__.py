@@ -0,0 +1,6 @@
+"""
+Luminlex 题目生成核心包
+
+不依赖 Streamlit，可被 Streamlit 页面、HTTP 服务、批处理脚本等共同使用。
+较重的依赖（openai）和单例在第一次使用时才加载。
+"""
@@ -0,0 +1,272 @@
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from luminlex import config
+from luminlex.cassette import get_cassette, request_digest
+from luminlex.shared_state import get_shared_state
+
+# 各平台的配置信息
+# batch_endpoint: 支持 OpenAI 兼容的文件批处理接口（/files + /batches）时，批处理请求行中的 url；
+# DeepSeek 的折扣是错峰时段计价而非批处理接口，未确认有兼容的 /batches 接口，暂不启用；Kimi 同样未确认。
+PLATFORM_CONFIG = {
+    "deepseek": {
+        "name": "DeepSeek",
+        "url": "https://api.deepseek.com",
+        "key_name": "deepseek_api_key",
+        "default_model": "deepseek-chat"
+    },
+    "kimi": {
+        "name": "Kimi (Moonshot)",
+        "url": "https://api.moonshot.cn/v1",
+        "key_name": "kimi_api_key",
+        "default_model": "kimi-k2-thinking"
+    },
+    "qwen": {
+        "name": "Qwen (DashScope)",
+        "url": "https://dashscope.aliyuncs.com/compatible-mode/v1",
+        "key_name": "qwen_api_key",
+        "default_model": "qwen-plus",
+        "batch_endpoint": "/v1/chat/completions"
+    },
+    "zhipuai": {
+        "name": "Zhipu AI (GLM)",
+        "url": "https://open.bigmodel.cn/api/paas/v4",
+        "key_name": "zhipuai_api_key",
+        "default_model": "glm-4.7",
+        "batch_endpoint": "/v4/chat/completions"
+    }
+}
+
+class TokenBucket:
+    """令牌桶限流器，按每分钟请求数（rpm）匀速发放令牌；令牌存放在共享状态中，所有副本共用同一份限额"""
+    
+    def __init__(self, name, rpm, speedup=1.0):
+        self.name = name
+        self.capacity = max(1, rpm)
+        # speedup 大于 1 时令牌补充得更快（回放请求时按 cassette_time_scale 压缩时间）
+        self.rate = self.capacity / 60.0 * speedup
+    
+    def acquire(self, reserve=0.0):
+        """取得一个令牌，令牌不足（或不超过 reserve 个）时阻塞等待"""
+        reserve = min(reserve, self.capacity - 1)
+        while True:
+            wait = get_shared_state().acquire_token(self.name, self.capacity, self.rate, reserve)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+# 当前线程的请求是否为预测式请求（预取），见 speculative()
+_request_context = threading.local()
+
+@contextmanager
+def speculative():
+    """
+    标记当前线程中的平台请求为预测式请求：平台配置了限流时只使用令牌桶中超出保留量的令牌，
+    保留量为桶容量的 speculative_reserve（默认 0.5），留给真实请求。
+    """
+    previous = getattr(_request_context, "speculative", False)
+    _request_context.speculative = True
+    try:
+        yield
+    finally:
+        _request_context.speculative = previous
+
+def _acquire(platform, time_scale=1.0):
+    """
+    为一次平台请求取得令牌（预测式请求不使用保留给真实请求的令牌）。
+    time_scale 为回放时的时间缩放比例：为 0 时不限流，小于 1 时令牌按比例更快补充。
+    """
+    limiter = get_rate_limiter(platform)
+    if limiter is None or time_scale <= 0:
+        return
+    if time_scale != 1:
+        limiter = TokenBucket(f"{limiter.name}:x{time_scale:g}", limiter.capacity, 1 / time_scale)
+    reserve = 0.0
+    if getattr(_request_context, "speculative", False):
+        reserve = limiter.capacity * float(config.get("speculative_reserve", 0.5))
+    limiter.acquire(reserve)
+
+# 进程内复用的客户端与限流器（Streamlit 页面和 HTTP 服务共用）
+_clients = {}
+_rate_limiters = {}
+_shared_lock = threading.Lock()
+
+def get_client(platform, api_key):
+    """获取指定平台的 OpenAI 兼容客户端（按平台和密钥复用）"""
+    if platform not in PLATFORM_CONFIG:
+        return None
+    
+    with _shared_lock:
+        client = _clients.get((platform, api_key))
+        if client is None:
+            # openai 导入较慢，只在第一次真正调用平台时导入
+            from openai import OpenAI
+            client = OpenAI(
+                api_key=api_key,
+                # 配置项 <platform>_base_url 可指向代理或本地的模拟服务
+                base_url=config.get(f"{platform}_base_url") or PLATFORM_CONFIG[platform]["url"]
+            )
+            _clients[(platform, api_key)] = client
+    return client
+
+def get_rate_limiter(platform):
+    """
+    获取指定平台的限流器。
+    每分钟请求数由配置项 <platform>_rpm 指定（应与账号在平台上的实际限额一致），
+    未配置或不大于 0 时不限流，返回 None。
+    """
+    with _shared_lock:
+        if platform not in _rate_limiters:
+            rpm = config.get(f"{platform}_rpm")
+            try:
+                rpm = float(rpm) if rpm is not None else 0.0
+            except ValueError:
+                print(f"配置项 {platform}_rpm 不是数字: {rpm!r}，不限流")
+                rpm = 0.0
+            _rate_limiters[platform] = TokenBucket("rpm:" + platform, rpm) if rpm > 0 else None
+        return _rate_limiters[platform]
+
+def _key_fingerprint(api_key):
+    """密钥的摘要（共享状态中不保存密钥本身）"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+def _list_models(pid, api_key):
+    """向平台请求模型列表，返回过滤并排序后的模型 id"""
+    client = get_client(pid, api_key)
+    if not client:
+        return []
+    
+    model_list = client.models.list()
+    model_ids = [m.id for m in model_list.data]
+    
+    # 针对特定平台进行模型过滤（可选）
+    if pid == "kimi":
+        model_ids = [m for m in model_ids if "moonshot" in m or "kimi" in m]
+    elif pid == "deepseek":
+        model_ids = [m for m in model_ids if "deepseek" in m]
+    
+    model_ids.sort()
+    return model_ids
+
+def _platform_health(pid, api_key):
+    """
+    平台探测结果，保存在共享状态中供所有副本复用。
+    返回 {"models": [...]} 或 {"error": str}；成功结果缓存 platform_health_ttl 秒（默认 600），
+    失败结果缓存 platform_failure_ttl 秒（默认 60）。
+    """
+    state = get_shared_state()
+    key = f"platform_health:{pid}:{_key_fingerprint(api_key)}"
+    cached = state.get(key)
+    if cached is not None:
+        return json.loads(cached)
+    
+    try:
+        health = {"models": _list_models(pid, api_key)}
+        ttl = float(config.get("platform_health_ttl", 600))
+    except Exception as e:
+        health = {"error": str(e)}
+        ttl = float(config.get("platform_failure_ttl", 60))
+    state.set(key, json.dumps(health).encode("utf-8"), ttl)
+    return health
+
+def probe_available_platforms():
+    """
+    根据配置（环境变量、secrets.toml 或 st.secrets）探测可用的平台。
+    返回: dict {platform_id: {"name": str, "models": list, "api_key": str}}
+    回放模式下直接返回录制的探测结果，不需要配置密钥。
+    """
+    cassette = get_cassette()
+    if cassette and cassette.replaying:
+        return cassette.replay_probe()
+    
+    start = time.perf_counter()
+    available = _probe_platforms()
+    if cassette:
+        cassette.record_probe(available, time.perf_counter() - start)
+    return available
+
+def _probe_platforms():
+    available = {}
+    
+    for pid, platform_config in PLATFORM_CONFIG.items():
+        key_name = platform_config["key_name"]
+        
+        # 1. 检查配置中是否有 key
+        api_key = config.get(key_name)
+        if not api_key:
+            continue
+        
+        # 2. 获取模型列表进行验证（其他副本最近探测过时直接复用结果）
+        try:
+            health = _platform_health(pid, api_key)
+        except Exception as e:
+            print(f"读取平台 {pid} 的探测结果失败: {str(e)}")
+            continue
+        
+        if "error" in health:
+            # 验证失败，不加入可用列表
+            print(f"探测平台 {pid} 失败: {health['error']}")
+            continue
+        
+        if health["models"]:
+            available[pid] = {
+                "name": platform_config["name"],
+                "models": health["models"],
+                "api_key": api_key,
+                "default_model": platform_config["default_model"]
+            }
+    
+    return available
+
+def get_chat_response(platform, api_key, model, messages, temperature=0.3, cache_ttl=None):
+    """
+    统一的对话接口。
+    cache_ttl 为响应缓存秒数，相同请求在有效期内（任意副本）直接返回缓存的回答；
+    默认取配置项 response_cache_ttl，为 0 时不缓存（题目生成需要每次得到不同的结果）。
+    配置了 cassette 时录制或回放请求（见 luminlex.cassette）。
+    """
+    digest = request_digest(platform, model, messages, temperature)
+    if cache_ttl is None:
+        cache_ttl = float(config.get("response_cache_ttl", 0))
+    cache_key = "response:" + digest if cache_ttl > 0 else None
+    if cache_key:
+        cached = get_shared_state().get(cache_key)
+        if cached is not None:
+            return cached.decode("utf-8")
+    
+    cassette = get_cassette()
+    try:
+        if cassette and cassette.replaying:
+            # 回放时同样经过限流，重现平台限额对吞吐的影响（等待时间按 cassette_time_scale 缩放）
+            _acquire(platform, cassette.time_scale)
+            content = cassette.replay_chat(platform, digest)
+        else:
+            client = get_client(platform, api_key)
+            if not client:
+                raise ValueError(f"无法创建平台 {platform} 的客户端")
+            
+            _acquire(platform)
+            start = time.perf_counter()
+            try:
+                response = client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=2000
+                )
+                content = response.choices[0].message.content
+            except Exception as e:
+                if cassette:
+                    cassette.record_chat(platform, model, digest, None, str(e), time.perf_counter() - start)
+                raise
+            if cassette:
+                cassette.record_chat(platform, model, digest, content, None, time.perf_counter() - start)
+    except Exception as e:
+        raise Exception(f"调用 {platform} 失败: {str(e)}")
+    
+    if cache_key and content:
+        get_shared_state().set(cache_key, content.encode("utf-8"), cache_ttl)
+    return content
@@ -0,0 +1,408 @@
+"""
+批量生成任务
+
+通过平台的文件批处理接口（OpenAI 兼容的 /files + /batches）离线生成大量题目：
+把提示词编译成批处理 JSONL 文件，上传并提交，轮询到完成后下载结果，逐条验证并做本地评分后写入题目库。
+批处理的吞吐上限远高于同步调用，价格也更低，适合一次性建立题库。
+
+每个任务在数据目录的 batches/<job_id>/ 下保存清单（manifest.json）、输入文件和下载的结果，
+每完成一步都会更新清单，中断后重新执行 run 会从上次的位置继续：
+已上传的文件不会重复上传，已提交的批次不会重复提交，已写入题目库的题目不会重复写入。
+无效或未通过本地评分的结果会重新编入新的批次，直到达到最大尝试次数。
+
+用法：
+    python -m luminlex.batch create --platform qwen --exam-type cet4 --question-types reading writing --count-per-type 500
+    python -m luminlex.batch run <job_id>            # 推进到全部完成（可随时中断后重新执行）
+    python -m luminlex.batch run <job_id> --once     # 只推进一步后退出（适合定时任务）
+    python -m luminlex.batch status <job_id>
+"""
+import argparse
+import json
+import os
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import msgspec
+
+from luminlex import api_utils, config
+from luminlex.models import Question
+from luminlex.question_generator import build_messages, get_question_generator
+from luminlex.question_store import question_store
+
+BATCH_DIR = os.path.join(config.DATA_DIR, "batches")
+
+# 单个批处理文件的最大请求数（DashScope 和智谱的上限均为 50000 行）
+MAX_REQUESTS_PER_FILE = 50000
+
+# 批次的终止状态；expired 和 cancelled 的批次也可能带有部分结果
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+_manifest_encoder = msgspec.json.Encoder()
+
+
+class BatchItem(msgspec.Struct, kw_only=True, omit_defaults=True):
+    """任务中的一道题（status: pending 待编译 / queued 已编入批次 / done 已入库 / failed 失败）"""
+    custom_id: str
+    params: Dict[str, Any]
+    status: str = "pending"
+    attempts: int = 0
+    question_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchChunk(msgspec.Struct, kw_only=True, omit_defaults=True):
+    """
+    一个批处理文件及其批次。
+    status: compiled 已生成文件 / uploaded 已上传 / submitting 已发出提交请求、尚未记录批次 id /
+            submitted 已提交 / finished 批次已结束 / collected 结果已入库
+    """
+    index: int
+    custom_ids: List[str]
+    status: str = "compiled"
+    input_file_id: Optional[str] = None
+    batch_id: Optional[str] = None
+    batch_status: Optional[str] = None
+    output_file_id: Optional[str] = None
+    error_file_id: Optional[str] = None
+
+
+class BatchManifest(msgspec.Struct, kw_only=True):
+    job_id: str
+    platform: str
+    model: str
+    created_at: float
+    items: Dict[str, BatchItem]
+    chunks: List[BatchChunk] = []
+    chunk_size: int = MAX_REQUESTS_PER_FILE
+    max_attempts: int = 3
+
+
+def plan_items(exam_type: str,
+               question_types: List[str],
+               count_per_type: int,
+               difficulty: str = "medium",
+               topics: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """列出每道题的生成参数：每种题目类型轮流使用各个子类型，指定了主题时轮流使用各个主题"""
+    question_type_info = get_question_generator().question_types
+    params = []
+    for question_type in question_types:
+        subtypes = question_type_info.get(question_type, {}).get("subtypes", [""])
+        for i in range(count_per_type):
+            params.append({
+                "exam_type": exam_type,
+                "question_type": question_type,
+                "subtype": subtypes[i % len(subtypes)],
+                "difficulty": difficulty,
+                "topic": topics[i % len(topics)] if topics else None
+            })
+    return params
+
+
+class BatchJob:
+    """一个可恢复的批量生成任务"""
+
+    def __init__(self, manifest: BatchManifest, directory: str):
+        self.manifest = manifest
+        self.directory = directory
+        self._client = None
+
+    @classmethod
+    def create(cls,
+               platform: str,
+               params: List[Dict[str, Any]],
+               model: Optional[str] = None,
+               chunk_size: int = MAX_REQUESTS_PER_FILE,
+               max_attempts: int = 3,
+               root: str = BATCH_DIR) -> "BatchJob":
+        """创建任务并编译批处理文件（尚未上传）"""
+        platform_config = api_utils.PLATFORM_CONFIG.get(platform)
+        if platform_config is None:
+            raise ValueError(f"未知平台: {platform}")
+        if not platform_config.get("batch_endpoint"):
+            raise ValueError(f"平台 {platform} 不支持批处理接口")
+
+        job_id = time.strftime("%Y%m%d_%H%M%S") + "_" + uuid.uuid4().hex[:6]
+        items = {}
+        for i, item_params in enumerate(params):
+            custom_id = f"q{i:06d}"
+            items[custom_id] = BatchItem(custom_id=custom_id, params=item_params)
+
+        manifest = BatchManifest(
+            job_id=job_id,
+            platform=platform,
+            model=model or platform_config["default_model"],
+            created_at=time.time(),
+            items=items,
+            chunk_size=min(chunk_size, MAX_REQUESTS_PER_FILE),
+            max_attempts=max_attempts
+        )
+        job = cls(manifest, os.path.join(root, job_id))
+        os.makedirs(job.directory, exist_ok=True)
+        job.compile_pending()
+        return job
+
+    @classmethod
+    def load(cls, job_id: str, root: str = BATCH_DIR) -> "BatchJob":
+        directory = os.path.join(root, job_id)
+        with open(os.path.join(directory, "manifest.json"), "rb") as f:
+            manifest = msgspec.json.decode(f.read(), type=BatchManifest)
+        return cls(manifest, directory)
+
+    def save(self):
+        """写入清单（先写临时文件再替换，中断时不会留下半个文件）"""
+        path = os.path.join(self.directory, "manifest.json")
+        with open(path + ".tmp", "wb") as f:
+            f.write(msgspec.json.format(_manifest_encoder.encode(self.manifest), indent=2))
+        os.replace(path + ".tmp", path)
+
+    def _path(self, kind: str, chunk: BatchChunk) -> str:
+        return os.path.join(self.directory, f"{kind}-{chunk.index:03d}.jsonl")
+
+    @property
+    def client(self):
+        if self._client is None:
+            platform = self.manifest.platform
+            api_key = config.get(api_utils.PLATFORM_CONFIG[platform]["key_name"])
+            if not api_key:
+                raise RuntimeError(f"未配置平台 {platform} 的密钥")
+            self._client = api_utils.get_client(platform, api_key)
+        return self._client
+
+    # 编译
+
+    def compile_pending(self) -> int:
+        """把待处理的题目编译成新的批处理文件，返回编入的题目数"""
+        pending = [item for item in self.manifest.items.values() if item.status == "pending"]
+        if not pending:
+            self.save()
+            return 0
+
+        generator = get_question_generator()
+        endpoint = api_utils.PLATFORM_CONFIG[self.manifest.platform]["batch_endpoint"]
+        chunk_size = self.manifest.chunk_size
+        for start in range(0, len(pending), chunk_size):
+            group = pending[start:start + chunk_size]
+            chunk = BatchChunk(index=len(self.manifest.chunks), custom_ids=[item.custom_id for item in group])
+            with open(self._path("input", chunk), "w", encoding="utf-8") as f:
+                for item in group:
+                    p = item.params
+                    prompt = generator._build_prompt(
+                        p["exam_type"], p["question_type"], p["subtype"], p["difficulty"], p.get("topic"), None
+                    )
+                    request = {
+                        "custom_id": item.custom_id,
+                        "method": "POST",
+                        "url": endpoint,
+                        "body": {
+                            "model": self.manifest.model,
+                            "messages": build_messages(prompt),
+                            "temperature": 0.3,
+                            "max_tokens": 2000
+                        }
+                    }
+                    f.write(json.dumps(request, ensure_ascii=False) + "\n")
+                    item.status = "queued"
+                    item.attempts += 1
+            self.manifest.chunks.append(chunk)
+        self.save()
+        return len(pending)
+
+    def requeue_failed(self) -> int:
+        """把未达到最大尝试次数的失败题目重新编入批次，返回重新编入的题目数"""
+        for item in self.manifest.items.values():
+            if item.status == "failed" and item.attempts < self.manifest.max_attempts:
+                item.status = "pending"
+                item.error = None
+        return self.compile_pending()
+
+    # 推进
+
+    def step(self) -> bool:
+        """每个批次推进一步，返回是否全部批次都已入库"""
+        for chunk in self.manifest.chunks:
+            if chunk.status == "compiled":
+                self._upload(chunk)
+            elif chunk.status in ("uploaded", "submitting"):
+                self._submit(chunk)
+            elif chunk.status == "submitted":
+                self._poll(chunk)
+            if chunk.status == "finished":
+                self._collect(chunk)
+        return all(chunk.status == "collected" for chunk in self.manifest.chunks)
+
+    def run(self, poll_interval: float = 30, once: bool = False) -> Dict[str, int]:
+        """推进任务直到所有题目入库或用尽尝试次数，once 为 True 时只推进一步"""
+        while True:
+            if self.step() and not self.requeue_failed():
+                break
+            if once:
+                break
+            time.sleep(poll_interval)
+        return self.summary()
+
+    def _upload(self, chunk: BatchChunk):
+        with open(self._path("input", chunk), "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        chunk.input_file_id = uploaded.id
+        chunk.status = "uploaded"
+        self.save()
+
+    def _submit(self, chunk: BatchChunk):
+        # 提交前先在清单中标记；上次提交后在记录批次 id 前中断时，先查找已提交的批次，避免重复提交（重复计费）
+        existing = None
+        if chunk.status == "submitting":
+            existing = self._find_submitted(chunk)
+        else:
+            chunk.status = "submitting"
+            self.save()
+        if existing is None:
+            existing = self.client.batches.create(
+                input_file_id=chunk.input_file_id,
+                endpoint=api_utils.PLATFORM_CONFIG[self.manifest.platform]["batch_endpoint"],
+                completion_window="24h",
+                metadata={"luminlex_job": self.manifest.job_id, "chunk": str(chunk.index)}
+            )
+        chunk.batch_id = existing.id
+        chunk.batch_status = existing.status
+        chunk.status = "submitted"
+        self.save()
+
+    def _find_submitted(self, chunk: BatchChunk):
+        """在最近的批次中查找该批处理文件已提交的批次（只读第一页，不翻页遍历账号的全部历史批次）"""
+        for batch in self.client.batches.list(limit=100).data:
+            metadata = batch.metadata or {}
+            if batch.input_file_id == chunk.input_file_id or (
+                    metadata.get("luminlex_job") == self.manifest.job_id and metadata.get("chunk") == str(chunk.index)):
+                return batch
+        return None
+
+    def _poll(self, chunk: BatchChunk):
+        batch = self.client.batches.retrieve(chunk.batch_id)
+        chunk.batch_status = batch.status
+        if batch.status in TERMINAL_STATUSES:
+            chunk.output_file_id = batch.output_file_id
+            chunk.error_file_id = batch.error_file_id
+            chunk.status = "finished"
+        self.save()
+
+    def _download(self, kind: str, chunk: BatchChunk, file_id: Optional[str]) -> List[Dict[str, Any]]:
+        """下载结果文件（本地已有时直接读取），返回解析后的行"""
+        if not file_id:
+            return []
+        path = self._path(kind, chunk)
+        if not os.path.exists(path):
+            content = self.client.files.content(file_id).content
+            with open(path + ".tmp", "wb") as f:
+                f.write(content)
+            os.replace(path + ".tmp", path)
+
+        lines = []
+        with open(path, "rb") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    lines.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    print(f"跳过无法解析的批处理结果: {e}")
+        return lines
+
+    def _collect(self, chunk: BatchChunk):
+        """验证批次结果并写入题目库"""
+        generator = get_question_generator()
+        platform_name = api_utils.PLATFORM_CONFIG[self.manifest.platform]["name"]
+        results = {}
+        for line in self._download("output", chunk, chunk.output_file_id) + self._download("error", chunk, chunk.error_file_id):
+            results[line.get("custom_id")] = line
+
+        for custom_id in chunk.custom_ids:
+            item = self.manifest.items[custom_id]
+            if item.status != "queued":
+                continue
+            item.error = None
+            line = results.get(custom_id)
+            response = (line or {}).get("response") or {}
+            if line is None:
+                item.error = f"批次 {chunk.batch_status} 中没有该请求的结果"
+            elif line.get("error") or response.get("status_code") != 200:
+                item.error = str(line.get("error") or response.get("body"))[:500]
+            else:
+                try:
+                    content = response["body"]["choices"][0]["message"]["content"]
+                except (KeyError, IndexError, TypeError):
+                    content = None
+                result = generator.parse_response(content) if content else None
+                if result is None:
+                    item.error = "响应不是有效的题目"
+                else:
+                    result["generated_by_ai"] = True
+                    result["ai_platform"] = platform_name
+                    # 题目 id 由任务和请求确定，中断后重新入库只会替换同一道题
+                    question_id = uuid.uuid5(uuid.NAMESPACE_URL, f"luminlex-batch:{self.manifest.job_id}/{custom_id}").hex
+                    question = Question.from_generated(result, item.params).replace(id=question_id)
+                    issues = generator.check_question(question, result.get("difficulty"))
+                    if issues:
+                        # 未通过本地评分的题目不入库，重新编入下一个批次
+                        item.error = "未通过本地评分: " + "；".join(issues)
+                    else:
+                        question_store.add(question)
+                        item.question_id = question_id
+                        item.status = "done"
+                        continue
+            item.status = "failed"
+
+        chunk.status = "collected"
+        self.save()
+
+    def summary(self) -> Dict[str, int]:
+        """各状态的题目数"""
+        return dict(Counter(item.status for item in self.manifest.items.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="通过平台批处理接口批量生成题目")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="创建任务并编译批处理文件")
+    create.add_argument("--platform", required=True,
+                        choices=[pid for pid, pc in api_utils.PLATFORM_CONFIG.items() if pc.get("batch_endpoint")])
+    create.add_argument("--model")
+    create.add_argument("--exam-type", required=True)
+    create.add_argument("--question-types", nargs="+", required=True)
+    create.add_argument("--count-per-type", type=int, default=100)
+    create.add_argument("--difficulty", default="medium")
+    create.add_argument("--topics", nargs="*")
+    create.add_argument("--chunk-size", type=int, default=MAX_REQUESTS_PER_FILE)
+    create.add_argument("--max-attempts", type=int, default=3)
+
+    run = commands.add_parser("run", help="推进任务（可中断后重新执行）")
+    run.add_argument("job_id")
+    run.add_argument("--poll-interval", type=float, default=30)
+    run.add_argument("--once", action="store_true", help="只推进一步后退出")
+
+    status = commands.add_parser("status", help="查看任务状态")
+    status.add_argument("job_id")
+
+    args = parser.parse_args()
+    if args.command == "create":
+        params = plan_items(args.exam_type, args.question_types, args.count_per_type, args.difficulty, args.topics)
+        job = BatchJob.create(args.platform, params, model=args.model,
+                              chunk_size=args.chunk_size, max_attempts=args.max_attempts)
+        print(f"已创建任务 {job.manifest.job_id}：{len(params)} 道题，{len(job.manifest.chunks)} 个批处理文件")
+    elif args.command == "run":
+        job = BatchJob.load(args.job_id)
+        summary = job.run(poll_interval=args.poll_interval, once=args.once)
+        print(f"任务 {args.job_id}：{summary}")
+    else:
+        job = BatchJob.load(args.job_id)
+        print(f"任务 {args.job_id}（{job.manifest.platform} / {job.manifest.model}）：{job.summary()}")
+        for chunk in job.manifest.chunks:
+            print(f"  批次 {chunk.index}：{len(chunk.custom_ids)} 道题，{chunk.status}"
+                  + (f"（{chunk.batch_status}）" if chunk.batch_status else ""))
+
+
+if __name__ == "__main__":
+    main()
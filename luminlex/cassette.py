@@ -0,0 +1,197 @@
+"""
+平台请求的录制与回放
+
+录制模式下，每次平台探测和对话请求的结果（包括错误）与耗时追加写入 gzip 压缩的 JSON Lines 文件（cassette）；
+回放模式下不访问平台、不需要密钥，按录制的内容和耗时返回结果，用于离线、可重复地测量完整生成流程的
+吞吐和延迟（真实平台的 JSON 前后说明文字、代码块、缺失字段等都会原样重现）。
+
+配置项：
+- cassette：文件路径（如 data/cassettes/deepseek.jsonl.gz），未设置时不启用
+- cassette_mode：record 录制 / replay 回放（默认）
+- cassette_time_scale：回放时耗时（以及平台限流的等待）的缩放比例，1 为原始耗时（默认），0 为不等待
+
+回放时按请求内容的摘要匹配录制的响应，同一请求录制了多次时依次返回；
+没有完全相同的请求时（例如提示词有改动）按录制顺序返回同一平台的下一条响应。
+"""
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from luminlex import config
+
+
+def request_digest(platform: str, model: str, messages: List[Dict[str, str]], temperature: float) -> str:
+    """对话请求的摘要（cassette 中不保存提示词本身）"""
+    request = json.dumps([platform, model, messages, temperature], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(request.encode("utf-8")).hexdigest()[:20]
+
+
+class _Cycle:
+    """依次返回列表中的元素，用完后从头开始"""
+
+    __slots__ = ("items", "position")
+
+    def __init__(self):
+        self.items: List[Dict[str, Any]] = []
+        self.position = 0
+
+    def next(self) -> Dict[str, Any]:
+        item = self.items[self.position % len(self.items)]
+        self.position += 1
+        return item
+
+
+class Cassette:
+    """一个录制文件"""
+
+    def __init__(self, path: str, mode: str = "replay", time_scale: float = 1.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"cassette_mode 只能是 record 或 replay: {mode}")
+        self.path = path
+        self.mode = mode
+        self.time_scale = time_scale
+        self._lock = threading.Lock()
+        self._file = None
+        self._probe: Optional[Dict[str, Any]] = None
+        self._by_request: Dict[str, _Cycle] = defaultdict(_Cycle)
+        self._by_platform: Dict[str, _Cycle] = defaultdict(_Cycle)
+        self.stats = {"exact": 0, "fallback": 0}
+        if mode == "replay":
+            self._load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    # 录制
+
+    def _write(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                # 追加模式下每个进程写入一个新的 gzip 成员，读取时自动连接
+                self._file = gzip.open(self.path, "ab")
+                atexit.register(self.close)
+            self._file.write(line.encode("utf-8"))
+            # 每条记录后同步刷新，进程中断时最多丢失最后一条
+            self._file.flush(zlib.Z_SYNC_FLUSH)
+
+    def record_probe(self, platforms: Dict[str, Dict[str, Any]], latency: float):
+        """录制平台探测结果（不保存密钥）"""
+        stripped = {
+            pid: {k: v for k, v in info.items() if k != "api_key"}
+            for pid, info in platforms.items()
+        }
+        self._write({"kind": "probe", "platforms": stripped, "latency": round(latency, 4)})
+
+    def record_chat(self,
+                    platform: str,
+                    model: str,
+                    digest: str,
+                    response: Optional[str],
+                    error: Optional[str],
+                    latency: float):
+        entry = {"kind": "chat", "platform": platform, "model": model, "request": digest, "latency": round(latency, 4)}
+        if error is None:
+            entry["response"] = response
+        else:
+            entry["error"] = error
+        self._write(entry)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # 回放
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"回放文件不存在: {self.path}")
+        count = 0
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    count += 1
+                    if entry["kind"] == "probe":
+                        self._probe = entry
+                    else:
+                        self._by_request[entry["request"]].items.append(entry)
+                        self._by_platform[entry["platform"]].items.append(entry)
+        except (EOFError, gzip.BadGzipFile) as e:
+            # 录制进程被中断时文件末尾不完整，之前的记录仍然可用
+            print(f"回放文件 {self.path} 末尾不完整，已读取 {count} 条记录: {e}")
+
+    def _wait(self, entry: Dict[str, Any]):
+        delay = entry.get("latency", 0) * self.time_scale
+        if delay > 0:
+            time.sleep(delay)
+
+    def replay_probe(self) -> Dict[str, Dict[str, Any]]:
+        """回放平台探测结果（密钥用占位值代替）"""
+        if self._probe is None:
+            return {}
+        self._wait(self._probe)
+        return {pid: dict(info, api_key="replay") for pid, info in self._probe["platforms"].items()}
+
+    def replay_chat(self, platform: str, digest: str) -> str:
+        """回放一次对话请求，录制时出错的请求抛出同样的错误"""
+        with self._lock:
+            if digest in self._by_request:
+                entry = self._by_request[digest].next()
+                self.stats["exact"] += 1
+            elif platform in self._by_platform:
+                entry = self._by_platform[platform].next()
+                self.stats["fallback"] += 1
+            else:
+                raise LookupError(f"回放文件中没有平台 {platform} 的记录")
+        self._wait(entry)
+        if "error" in entry:
+            raise Exception(entry["error"])
+        return entry["response"]
+
+
+_instance: Optional[Cassette] = None
+_loaded = False
+_instance_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """按配置获取录制文件，未配置时返回 None"""
+    global _instance, _loaded
+    if not _loaded:
+        with _instance_lock:
+            if not _loaded:
+                path = config.get("cassette")
+                if path:
+                    _instance = Cassette(
+                        path,
+                        mode=config.get("cassette_mode", "replay"),
+                        time_scale=float(config.get("cassette_time_scale", 1.0))
+                    )
+                _loaded = True
+    return _instance
+
+
+def set_cassette(cassette: Optional[Cassette]):
+    """替换当前的录制文件（用于测试和脚本）"""
+    global _instance, _loaded
+    with _instance_lock:
+        _instance = cassette
+        _loaded = True
@@ -0,0 +1,111 @@
+"""
+配置来源
+
+按顺序查询多个配置来源，返回第一个设置了的值（0、false 等也是有效的值）。默认来源为环境变量和 secrets.toml 文件，
+Streamlit 页面启动时会把 st.secrets 加到最前面。核心模块不依赖 Streamlit。
+"""
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+# 数据目录（题目库、共享状态等；容器中应挂载为可写卷）
+DATA_DIR = os.environ.get("LUMINLEX_DATA_DIR", "data")
+
+
+class ConfigSource:
+    """配置来源基类"""
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+
+class EnvSource(ConfigSource):
+    """环境变量，依次查找 LUMINLEX_<KEY> 和 <KEY>（均为大写），空字符串视为未设置"""
+
+    def __init__(self, prefix: str = "LUMINLEX_"):
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        name = key.upper()
+        return os.environ.get(self.prefix + name) or os.environ.get(name) or None
+
+
+class TomlSource(ConfigSource):
+    """TOML 文件（格式与 .streamlit/secrets.toml 相同），首次查询时读取"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._values: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if self._values is None:
+                self._values = self._load()
+        return self._values.get(key)
+
+    def _load(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {}
+        import tomllib
+        try:
+            with open(self.path, "rb") as f:
+                return tomllib.load(f)
+        except (OSError, tomllib.TOMLDecodeError) as e:
+            print(f"读取配置文件 {self.path} 失败: {e}")
+            return {}
+
+
+class StreamlitSecretsSource(ConfigSource):
+    """st.secrets（只在 Streamlit 页面中使用，调用时才导入 streamlit）"""
+
+    def get(self, key: str) -> Optional[Any]:
+        import streamlit as st
+        try:
+            return st.secrets[key] if key in st.secrets else None
+        except Exception:
+            # 没有任何 secrets 文件时 st.secrets 会抛出异常
+            return None
+
+
+def _default_sources() -> List[ConfigSource]:
+    sources: List[ConfigSource] = [EnvSource()]
+    config_path = os.environ.get("LUMINLEX_CONFIG")
+    if config_path:
+        sources.append(TomlSource(config_path))
+    sources.append(TomlSource(os.path.join(".streamlit", "secrets.toml")))
+    sources.append(TomlSource(os.path.join(os.path.expanduser("~"), ".streamlit", "secrets.toml")))
+    return sources
+
+
+_sources: List[ConfigSource] = _default_sources()
+_sources_lock = threading.Lock()
+
+
+def add_source(source: ConfigSource, first: bool = True):
+    """添加配置来源，默认优先于已有来源"""
+    with _sources_lock:
+        if any(type(existing) is type(source) and vars(existing) == vars(source) for existing in _sources):
+            return
+        if first:
+            _sources.insert(0, source)
+        else:
+            _sources.append(source)
+
+
+def set_sources(sources: List[ConfigSource]):
+    """替换全部配置来源"""
+    global _sources
+    with _sources_lock:
+        _sources = list(sources)
+
+
+def get(key: str, default: Any = None) -> Any:
+    """按来源顺序查找配置项"""
+    with _sources_lock:
+        sources = list(_sources)
+    for source in sources:
+        value = source.get(key)
+        if value is not None:
+            return value
+    return default
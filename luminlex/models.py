@@ -0,0 +1,169 @@
+import sys
+import time
+import uuid
+from enum import Enum
+from typing import Dict, List, Optional, Any, Tuple
+
+import msgspec
+
+
+class ExamType(str, Enum):
+    """考试类型"""
+    CET4 = "cet4"
+    CET6 = "cet6"
+    TEM4 = "tem4"
+    TEM8 = "tem8"
+    IELTS = "ielts"
+    TOEFL = "toefl"
+
+
+class QuestionType(str, Enum):
+    """题目类型"""
+    LISTENING = "listening"
+    READING = "reading"
+    WRITING = "writing"
+    TRANSLATION = "translation"
+
+
+class Difficulty(str, Enum):
+    """难度级别"""
+    EASY = "easy"
+    MEDIUM = "medium"
+    HARD = "hard"
+
+
+# AI 返回的难度可能是中文或其他写法
+_DIFFICULTY_ALIASES = {
+    "easy": Difficulty.EASY, "简单": Difficulty.EASY, "容易": Difficulty.EASY,
+    "medium": Difficulty.MEDIUM, "中等": Difficulty.MEDIUM, "适中": Difficulty.MEDIUM,
+    "hard": Difficulty.HARD, "困难": Difficulty.HARD, "较难": Difficulty.HARD, "难": Difficulty.HARD
+}
+
+
+def parse_difficulty(value: Any, default: Difficulty) -> Difficulty:
+    """把任意写法的难度转换为 Difficulty，无法识别时返回默认值"""
+    if isinstance(value, Difficulty):
+        return value
+    return _DIFFICULTY_ALIASES.get(str(value).strip().lower(), default)
+
+
+def _normalize_options(options: Any) -> Optional[Tuple[str, ...]]:
+    """把 AI 返回的各种选项格式统一为字符串元组"""
+    if not options:
+        return None
+    if isinstance(options, dict):
+        return tuple(f"{key}. {value}" for key, value in options.items())
+    if isinstance(options, (list, tuple)):
+        return tuple(str(option) for option in options)
+    return None
+
+
+class Question(msgspec.Struct, kw_only=True, omit_defaults=True):
+    """
+    一道题目。
+
+    考试类型、题目类型和难度为枚举成员，子类型字符串会被驻留，
+    大量题目（历史记录、预取池、题目集、题目库）共享同一份对象。
+    """
+    exam_type: ExamType
+    question_type: QuestionType
+    subtype: str
+    difficulty: Difficulty
+    question: str
+    answer: str
+    explanation: str
+    options: Optional[Tuple[str, ...]] = None
+    estimated_time: float = 5
+    topic: Optional[str] = None
+    id: str = ""
+    generated_at: float = 0.0
+    generated_by_ai: bool = False
+    ai_platform: Optional[str] = None
+    repaired_fields: Tuple[str, ...] = ()
+
+    def __post_init__(self):
+        self.subtype = sys.intern(self.subtype)
+        if not self.id:
+            self.id = uuid.uuid4().hex
+        if not self.generated_at:
+            self.generated_at = time.time()
+
+    @classmethod
+    def from_generated(cls, data: Dict[str, Any], params: Dict[str, Any]) -> "Question":
+        """
+        由生成结果（AI 响应或模拟数据）和生成参数构建题目。
+        难度始终为请求的难度，不采用 AI 自己标注的难度（标注不符的题目由本地评分拒绝，
+        见 QuestionGenerator.check_question）。
+        """
+        try:
+            estimated_time = float(data.get("estimated_time", 5))
+        except (TypeError, ValueError):
+            estimated_time = 5
+        return cls(
+            exam_type=ExamType(params["exam_type"]),
+            question_type=QuestionType(params["question_type"]),
+            subtype=params["subtype"],
+            difficulty=Difficulty(params["difficulty"]),
+            question=str(data["question"]),
+            answer=str(data.get("answer", "")),
+            explanation=str(data.get("explanation", "")),
+            options=_normalize_options(data.get("options")),
+            estimated_time=estimated_time,
+            topic=params.get("topic"),
+            generated_by_ai=bool(data.get("generated_by_ai", False)),
+            ai_platform=data.get("ai_platform"),
+            repaired_fields=tuple(data.get("repaired_fields", ()))
+        )
+
+    def replace(self, **changes) -> "Question":
+        """返回修改了部分字段的新题目（保持 id 不变）"""
+        return msgspec.structs.replace(self, **changes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return msgspec.to_builtins(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Question":
+        return msgspec.convert(data, cls)
+
+    def to_json(self) -> bytes:
+        return _encoder.encode(self)
+
+    @classmethod
+    def from_json(cls, data: bytes) -> "Question":
+        return _question_decoder.decode(data)
+
+
+class QuestionSetSummary(msgspec.Struct):
+    """题目集摘要（reused_questions 为复用题目库中已有的题目数，generated_questions 为新生成的题目数）"""
+    total_questions: int
+    total_estimated_time: float
+    question_types: List[QuestionType]
+    average_difficulty: Difficulty
+    reused_questions: int = 0
+    generated_questions: int = 0
+
+
+class QuestionSet(msgspec.Struct, kw_only=True):
+    """一套题目"""
+    exam_type: ExamType
+    difficulty: Difficulty
+    topic: Optional[str] = None
+    generated_at: float = msgspec.field(default_factory=time.time)
+    questions: List[Question] = msgspec.field(default_factory=list)
+    summary: Optional[QuestionSetSummary] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return msgspec.to_builtins(self)
+
+    def to_json(self) -> bytes:
+        return _encoder.encode(self)
+
+    @classmethod
+    def from_json(cls, data: bytes) -> "QuestionSet":
+        return _question_set_decoder.decode(data)
+
+
+_encoder = msgspec.json.Encoder()
+_question_decoder = msgspec.json.Decoder(Question)
+_question_set_decoder = msgspec.json.Decoder(QuestionSet)
@@ -0,0 +1,199 @@
+"""
+离线题目引擎
+
+AI 平台不可用时的降级方案，也可作为性能测试的负载生成器。
+听力和阅读使用题库中的英文听力原文和短文，写作和翻译使用模板和句库；题库在启动时加载一次并预编译。
+每个会话对每种题型无放回抽样，抽完一轮后重新洗牌，保证连续生成的题目不重复；
+选择题每次抽取时打乱选项顺序（答案随之调整），答案字母不会集中在某一项。
+"""
+import json
+import os
+import random
+import string
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Tuple
+
+from luminlex.models import Question, ExamType, QuestionType, Difficulty
+
+BANK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "offline_bank.json")
+
+# 没有指定会话时使用的共享会话
+_SHARED_SESSION = "__shared__"
+
+_LETTERS = string.ascii_uppercase
+
+
+class _Template:
+    """
+    预编译的题目模板。
+    options 为不带字母的选项内容，answer_index 为正确选项的下标；shuffle 为 False 时保持选项顺序
+    （如"正确/错误/文中未提及"）。topic 不为空时题目内容固定属于该主题（听力原文、阅读短文）。
+    """
+
+    __slots__ = ("question", "answer", "explanation", "options", "answer_index", "shuffle",
+                 "topic", "estimated_time", "fields")
+
+    def __init__(self, data: Dict[str, Any], topic: Optional[str] = None):
+        self.question = data["question"]
+        self.answer = data["answer"]
+        self.explanation = data["explanation"]
+        self.options = tuple(data["options"]) if data.get("options") else None
+        self.answer_index = _LETTERS.index(self.answer) if self.options else None
+        self.shuffle = bool(data.get("shuffle_options", True))
+        self.topic = topic
+        self.estimated_time = float(data.get("estimated_time", 5))
+        self.fields = frozenset(
+            name
+            for text in (self.question, self.answer, self.explanation)
+            for _, name, _, _ in string.Formatter().parse(text)
+            if name
+        )
+
+
+class OfflineEngine:
+    """基于模板和句库的离线题目生成器"""
+
+    def __init__(self, bank_path: str = BANK_PATH, seed: Optional[int] = None, max_sessions: int = 1024):
+        self.max_sessions = max_sessions
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # 会话 -> {(题目类型, 子类型[, 主题]): 剩余的候选下标}
+        self._decks: "OrderedDict[str, Dict[Tuple, List[int]]]" = OrderedDict()
+
+        with open(bank_path, encoding="utf-8") as f:
+            bank = json.load(f)
+        self._compile(bank)
+
+    def _compile(self, bank: Dict[str, Any]):
+        """把题库展开为每种 (题目类型, 子类型) 的候选列表：听力原文和短文中的每道小题，以及模板 × 填充内容"""
+        topics = bank["topics"]
+        sentences = bank["sentences"]
+        self._word_requirements = bank["word_requirements"]
+
+        # 候选项为 (模板, 填充值)，子类型为空时使用该题目类型的全部候选；
+        # 内容固定属于某个主题的候选另按 (题目类型, 子类型, 主题) 索引，指定主题时优先使用
+        self._candidates: Dict[Tuple, List[Tuple[_Template, Dict[str, str]]]] = {}
+        formats = bank["material_formats"]
+        for material in bank["materials"]:
+            qtype = material["question_type"]
+            for item in material["items"]:
+                data = dict(item, question=formats[qtype].format(text=material["text"], question=item["question"]))
+                data.setdefault("shuffle_options", material.get("shuffle_options", True))
+                candidate = (_Template(data, topic=material["topic"]), {})
+                for subtype in material["subtypes"]:
+                    for key in ((qtype, subtype), (qtype, ""), (qtype, subtype, material["topic"]),
+                                (qtype, "", material["topic"])):
+                        self._candidates.setdefault(key, []).append(candidate)
+
+        for data in bank["templates"]:
+            template = _Template(data)
+            qtype = data["question_type"]
+            for subtype in data["subtypes"]:
+                if "sentence" in template.fields:
+                    fills = [{"sentence": s["text"], "reference": s["reference"]} for s in sentences[subtype]]
+                else:
+                    fills = [{"topic": topic} for topic in topics.get(qtype, [""])]
+                candidates = [(template, fill) for fill in fills]
+                self._candidates.setdefault((qtype, subtype), []).extend(candidates)
+                self._candidates.setdefault((qtype, ""), []).extend(candidates)
+
+    def supports(self, question_type: str, subtype: str = "") -> bool:
+        return (question_type, subtype) in self._candidates
+
+    def generate(self,
+                 exam_type: str,
+                 question_type: str,
+                 subtype: str,
+                 difficulty: str,
+                 topic: Optional[str] = None,
+                 session_id: Optional[str] = None) -> Question:
+        """生成一道离线题目"""
+        key = (question_type, subtype) if (question_type, subtype) in self._candidates else (question_type, "")
+        if topic and key + (topic,) in self._candidates:
+            key += (topic,)
+        candidates = self._candidates.get(key)
+        if not candidates:
+            raise ValueError(f"离线题库不支持题目类型: {question_type}")
+
+        template, fill = candidates[self._draw(session_id or _SHARED_SESSION, key, len(candidates))]
+        values = dict(fill)
+        if topic:
+            values["topic"] = topic
+        values["word_requirement"] = self._word_requirements.get(difficulty, self._word_requirements["medium"])
+        options, answer = self._arrange_options(template)
+        if options is None:
+            answer = template.answer.format_map(values) if template.fields else template.answer
+
+        return Question(
+            exam_type=ExamType(exam_type),
+            question_type=QuestionType(question_type),
+            subtype=subtype,
+            difficulty=Difficulty(difficulty),
+            question=template.question.format_map(values) if template.fields else template.question,
+            options=options,
+            answer=answer,
+            explanation=template.explanation.format_map(values) if template.fields else template.explanation,
+            estimated_time=template.estimated_time,
+            topic=template.topic or values.get("topic") or topic,
+            generated_by_ai=False
+        )
+
+    def _arrange_options(self, template: _Template) -> Tuple[Optional[Tuple[str, ...]], Optional[str]]:
+        """按随机顺序排列选项并加上字母，返回 (选项, 答案字母)；没有选项时返回 (None, None)"""
+        if template.options is None:
+            return None, None
+        order = list(range(len(template.options)))
+        if template.shuffle:
+            with self._lock:
+                self._random.shuffle(order)
+        options = tuple(f"{_LETTERS[i]}. {template.options[j]}" for i, j in enumerate(order))
+        return options, _LETTERS[order.index(template.answer_index)]
+
+    def generate_many(self, count: int, **params) -> List[Question]:
+        """批量生成离线题目（用作性能测试的负载）"""
+        return [self.generate(**params) for _ in range(count)]
+
+    def discard_session(self, session_id: str):
+        with self._lock:
+            self._decks.pop(session_id, None)
+
+    def _draw(self, session_id: str, key: Tuple, size: int) -> int:
+        """从会话的牌堆中无放回地抽取一个候选下标"""
+        with self._lock:
+            decks = self._decks.get(session_id)
+            if decks is None:
+                decks = self._decks[session_id] = {}
+                if len(self._decks) > self.max_sessions:
+                    self._decks.popitem(last=False)
+            else:
+                self._decks.move_to_end(session_id)
+
+            deck = decks.get(key)
+            if not deck:
+                deck = decks[key] = list(range(size))
+                self._random.shuffle(deck)
+            return deck.pop()
+
+
+_instance: Optional[OfflineEngine] = None
+_instance_lock = threading.Lock()
+
+
+def get_offline_engine() -> OfflineEngine:
+    """获取单例实例（第一次调用时加载题库）"""
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = OfflineEngine()
+    return _instance
+
+
+if __name__ == "__main__":
+    count = 100000
+    start = time.perf_counter()
+    get_offline_engine().generate_many(count, exam_type="cet4", question_type="reading", subtype="cloze", difficulty="medium")
+    elapsed = time.perf_counter() - start
+    print(f"生成 {count} 道题目用时 {elapsed:.3f}s（{count / elapsed:.0f} 题/秒）")
@@ -0,0 +1,238 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from typing import Dict, Optional, Any, Callable, Tuple
+from luminlex import api_utils
+from luminlex.models import Question
+from luminlex.question_generator import get_question_generator
+
+
+class _SessionState:
+    """单个会话的预取状态"""
+
+    def __init__(self):
+        self.observed_key: Optional[Tuple] = None
+        self.timer: Optional[threading.Timer] = None
+        self.future: Optional[Future] = None
+        self.future_key: Optional[Tuple] = None
+        self.spent = deque()
+        self.last_seen = time.monotonic()
+
+
+class PrefetchManager:
+    """
+    预测式预取：用户选择稳定一段时间后在后台提前生成题目，
+    并为"重新生成"始终保留一道相同选项的题目。
+
+    预取受每会话预算（时间窗口内的最大预取次数）和全局预算（同时进行的最大预取数）限制，
+    真实请求正在进行时让出全局名额；预取的平台请求只使用平台令牌桶中超出保留量的令牌
+    （见 api_utils.speculative），不会挤占真实请求的限额。
+    命中率和浪费的调用次数每隔 log_interval 秒打印一次。
+    """
+
+    def __init__(self,
+                 generate_fn: Callable[..., Question],
+                 enabled_fn: Callable[[], bool] = lambda: True,
+                 debounce_seconds: float = 1.5,
+                 session_budget: int = 20,
+                 budget_window: float = 3600.0,
+                 global_budget: int = 4,
+                 session_ttl: float = 1800.0,
+                 wait_timeout: float = 30.0,
+                 log_interval: float = 600.0):
+        self.generate_fn = generate_fn
+        self.enabled_fn = enabled_fn
+        self.debounce_seconds = debounce_seconds
+        self.session_budget = session_budget
+        self.budget_window = budget_window
+        self.global_budget = global_budget
+        self.session_ttl = session_ttl
+        self.wait_timeout = wait_timeout
+        self.log_interval = log_interval
+
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, _SessionState] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._inflight = 0
+        self._real_inflight = 0
+        self._logged_at = time.monotonic()
+        self._stats = {
+            "speculative_calls": 0,
+            "hits": 0,
+            "misses": 0,
+            "wasted": 0,
+            "skipped_budget": 0
+        }
+
+    @staticmethod
+    def make_key(params: Dict[str, Any]) -> Tuple:
+        """把生成参数转换为可比较的键"""
+        return tuple(sorted((k, v) for k, v in params.items()))
+
+    def observe(self, session_id: str, params: Dict[str, Any]):
+        """记录会话当前的选择，选择稳定 debounce_seconds 后开始预取"""
+        key = self.make_key(params)
+        with self._lock:
+            self._expire_sessions()
+            state = self._sessions.setdefault(session_id, _SessionState())
+            state.last_seen = time.monotonic()
+            if key == state.observed_key:
+                return
+            state.observed_key = key
+            if state.timer:
+                state.timer.cancel()
+                state.timer = None
+            if key == state.future_key:
+                # 切换回已在预取的选项：取消其他选项的等待，保留这次预取
+                return
+            state.timer = threading.Timer(self.debounce_seconds, self._start, args=(session_id, key, dict(params)))
+            state.timer.daemon = True
+            state.timer.start()
+
+    def refill(self, session_id: str, params: Dict[str, Any]):
+        """立即为"重新生成"预取一道相同选项的题目"""
+        key = self.make_key(params)
+        with self._lock:
+            state = self._sessions.setdefault(session_id, _SessionState())
+            state.last_seen = time.monotonic()
+            state.observed_key = key
+            if state.timer:
+                state.timer.cancel()
+                state.timer = None
+        self._start(session_id, key, dict(params))
+
+    def take(self, session_id: str, params: Dict[str, Any]) -> Optional[Question]:
+        """取出与当前选项匹配的预取题目，没有时返回 None"""
+        self._maybe_log()
+        key = self.make_key(params)
+        with self._lock:
+            state = self._sessions.get(session_id)
+            future = state.future if state and state.future_key == key else None
+            if future is None:
+                self._stats["misses"] += 1
+                return None
+            state.future = None
+            state.future_key = None
+
+        try:
+            # 相同选项的预取还在进行时，等待它完成比重新请求更快
+            question = future.result(timeout=self.wait_timeout)
+        except (FutureTimeoutError, Exception) as e:
+            print(f"预取题目不可用: {e}")
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        with self._lock:
+            self._stats["hits"] += 1
+        return question
+
+    @contextmanager
+    def real_request(self):
+        """标记一次真实请求，期间预取让出全局名额"""
+        with self._lock:
+            self._real_inflight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._real_inflight -= 1
+
+    def discard_session(self, session_id: str):
+        """丢弃会话的预取状态"""
+        with self._lock:
+            state = self._sessions.pop(session_id, None)
+            if state:
+                self._discard(state)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回预取命中率与浪费的调用次数"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["inflight"] = self._inflight
+            stats["sessions"] = len(self._sessions)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def _maybe_log(self):
+        """距上次打印超过 log_interval 秒时打印预取统计"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._logged_at < self.log_interval:
+                return
+            self._logged_at = now
+        stats = self.stats()
+        print(f"预取统计: 预取 {stats['speculative_calls']} 次，命中 {stats['hits']} 次，"
+              f"未命中 {stats['misses']} 次（命中率 {stats['hit_rate']:.0%}），浪费 {stats['wasted']} 次，"
+              f"超出预算跳过 {stats['skipped_budget']} 次")
+
+    def _start(self, session_id: str, key: Tuple, params: Dict[str, Any]):
+        """在预算允许时提交一次后台预取"""
+        if not self.enabled_fn():
+            return
+
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None or state.observed_key != key:
+                return
+            if state.future_key == key:
+                return
+
+            now = time.monotonic()
+            while state.spent and now - state.spent[0] > self.budget_window:
+                state.spent.popleft()
+            available_slots = self.global_budget - self._real_inflight
+            if len(state.spent) >= self.session_budget or self._inflight >= available_slots:
+                self._stats["skipped_budget"] += 1
+                return
+
+            # 选项变化后之前的预取结果不会再被使用
+            self._discard(state)
+            state.spent.append(now)
+            self._inflight += 1
+            self._stats["speculative_calls"] += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.global_budget,
+                                                    thread_name_prefix="prefetch")
+            state.future = self._executor.submit(self._run, params)
+            state.future_key = key
+
+    def _run(self, params: Dict[str, Any]) -> Question:
+        try:
+            with api_utils.speculative():
+                return self.generate_fn(**params)
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+    def _discard(self, state: _SessionState):
+        """丢弃会话中未被使用的预取（调用方需持有锁）"""
+        if state.timer:
+            state.timer.cancel()
+            state.timer = None
+        if state.future is not None:
+            if state.future.cancel():
+                # 尚未开始执行，不计入预取调用
+                self._inflight -= 1
+                self._stats["speculative_calls"] -= 1
+            else:
+                self._stats["wasted"] += 1
+            state.future = None
+            state.future_key = None
+
+    def _expire_sessions(self):
+        """清理长时间未活动的会话（调用方需持有锁）"""
+        now = time.monotonic()
+        expired = [sid for sid, state in self._sessions.items() if now - state.last_seen > self.session_ttl]
+        for sid in expired:
+            self._discard(self._sessions.pop(sid))
+
+
+# 单例实例
+prefetcher = PrefetchManager(
+    generate_fn=lambda **params: get_question_generator().generate_question(**params),
+    enabled_fn=lambda: bool(get_question_generator().available_platforms)
+)
@@ -0,0 +1,577 @@
+import json
+import re
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+from luminlex import api_utils, config
+from luminlex.models import Question, QuestionSet, QuestionSetSummary, QuestionType, Difficulty, ExamType, parse_difficulty
+from luminlex.offline_engine import get_offline_engine
+from luminlex.question_store import question_store
+from luminlex.set_planner import GenerationBatch, SetPlan, plan_question_set
+
+SYSTEM_PROMPT = "你是一个专业的英语教育专家，擅长生成各种英语考试题目。请严格按照要求的JSON格式返回题目。"
+
+# AI可能会在JSON前后添加说明文字
+JSON_PATTERN = re.compile(r'\{.*\}', re.DOTALL)
+JSON_ARRAY_PATTERN = re.compile(r'\[.*\]', re.DOTALL)
+
+# 题目的必要字段（难度始终为请求的难度，不需要补全，见 Question.from_generated）
+REQUIRED_FIELDS = ["question", "answer", "explanation", "estimated_time"]
+
+# 题目本身的字段（用作补全时的上下文）
+QUESTION_FIELDS = ["question", "options", "answer", "explanation", "difficulty", "estimated_time"]
+
+FIELD_DESCRIPTIONS = {
+    "question": "题目内容",
+    "options": "选项列表（如果是选择题）",
+    "answer": "正确答案",
+    "explanation": "答案解析",
+    "difficulty": "难度级别",
+    "estimated_time": "预计完成时间（分钟，数字）"
+}
+
+
+def build_messages(prompt: str) -> List[Dict[str, str]]:
+    """题目生成请求的对话消息"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _is_positive_number(value: Any) -> bool:
+    """判断是否为正数（允许数字字符串）"""
+    try:
+        return float(value) > 0
+    except (TypeError, ValueError):
+        return False
+
+
+class QuestionGenerator:
+    """题目生成器核心类"""
+    
+    def __init__(self):
+        self.question_types = {
+            "listening": {
+                "name": "听力",
+                "subtypes": ["short_conversation", "long_conversation", "passage", "news"]
+            },
+            "reading": {
+                "name": "阅读",
+                "subtypes": ["cloze", "matching", "multiple_choice", "true_false"]
+            },
+            "writing": {
+                "name": "写作",
+                "subtypes": ["argumentative", "descriptive", "narrative", "letter"]
+            },
+            "translation": {
+                "name": "翻译",
+                "subtypes": ["chinese_to_english", "english_to_chinese"]
+            }
+        }
+        
+        self.difficulty_levels = {
+            "easy": {"name": "简单", "description": "适合初学者"},
+            "medium": {"name": "中等", "description": "适合有一定基础的学习者"},
+            "hard": {"name": "困难", "description": "适合高级学习者或考试准备"}
+        }
+        
+        self.exam_types = {
+            "cet4": {"name": "大学英语四级", "level": "medium"},
+            "cet6": {"name": "大学英语六级", "level": "hard"},
+            "tem4": {"name": "专业英语四级", "level": "medium"},
+            "tem8": {"name": "专业英语八级", "level": "hard"},
+            "ielts": {"name": "雅思", "level": "hard"},
+            "toefl": {"name": "托福", "level": "hard"}
+        }
+        
+        # 可用AI平台在第一次使用时探测（需要网络请求）
+        self._available_platforms: Optional[Dict[str, Any]] = None
+        self._platforms_lock = threading.Lock()
+    
+    @property
+    def available_platforms(self) -> Dict[str, Any]:
+        """可用的AI平台"""
+        if self._available_platforms is None:
+            with self._platforms_lock:
+                if self._available_platforms is None:
+                    self._init_ai_platforms()
+        return self._available_platforms
+    
+    def _init_ai_platforms(self):
+        """初始化可用的AI平台"""
+        try:
+            self._available_platforms = api_utils.probe_available_platforms()
+        except Exception as e:
+            print(f"初始化AI平台失败: {e}")
+            self._available_platforms = {}
+    
+    def generate_question(self, 
+                         exam_type: str,
+                         question_type: str,
+                         subtype: str,
+                         difficulty: str,
+                         topic: Optional[str] = None,
+                         word_count: Optional[int] = None,
+                         session_id: Optional[str] = None) -> Question:
+        """生成单个题目"""
+        
+        params = {
+            "exam_type": exam_type,
+            "question_type": question_type,
+            "subtype": subtype,
+            "difficulty": difficulty,
+            "topic": topic
+        }
+        
+        # 构建提示词
+        prompt = self._build_prompt(exam_type, question_type, subtype, difficulty, topic, word_count)
+        
+        # 尝试使用AI API生成题目；未通过本地评分的题目不保存，重新生成
+        question = None
+        for _ in range(1 + int(config.get("scoring_retries", 1))):
+            result = self._generate_with_ai(prompt)
+            if not result:
+                break
+            candidate = Question.from_generated(result, params)
+            issues = self.check_question(candidate, result.get("difficulty"))
+            if not issues:
+                question = candidate
+                break
+            print(f"AI生成的题目未通过本地评分: {'；'.join(issues)}")
+        
+        if question is None:
+            # 如果AI生成失败，使用离线题库（同一会话内不重复）
+            question = get_offline_engine().generate(session_id=session_id, **params)
+        
+        # 保存到题目库，便于按 id 查找
+        question_store.add(question)
+        return question
+    
+    def check_question(self, question: Question, labeled: Any = None) -> List[str]:
+        """
+        本地评分（结构和难度），返回发现的问题，不调用平台。
+        难度分按题目要求的难度检查；labeled 为 AI 在响应中标注的难度，与要求的难度不同时同样视为不通过。
+        """
+        from luminlex.scoring import get_scorer
+        issues = list(get_scorer().score(question).issues)
+        if labeled is not None and parse_difficulty(labeled, question.difficulty) != question.difficulty:
+            issues.append(f"AI 标注的难度「{labeled}」与要求的「{question.difficulty.value}」不符")
+        return issues
+    
+    def _build_prompt(self,
+                     exam_type: str,
+                     question_type: str,
+                     subtype: str,
+                     difficulty: str,
+                     topic: Optional[str],
+                     word_count: Optional[int],
+                     count: int = 1,
+                     estimated_time: Optional[float] = None) -> str:
+        """构建AI提示词（count 大于 1 时一次生成多道题，以JSON数组返回）"""
+        
+        exam_name = self.exam_types.get(exam_type, {}).get("name", exam_type)
+        qtype_name = self.question_types.get(question_type, {}).get("name", question_type)
+        diff_name = self.difficulty_levels.get(difficulty, {}).get("name", difficulty)
+        
+        if count > 1:
+            prompt = f"""请生成{count}道{exam_name}的{qtype_name}题目，各题的主题和内容不要重复。
+"""
+        else:
+            prompt = f"""请生成一道{exam_name}的{qtype_name}题目。
+"""
+        
+        prompt += f"""
+具体要求：
+1. 题目类型：{subtype}
+2. 难度级别：{diff_name}
+3. 考试类型：{exam_name}
+"""
+        
+        if topic:
+            prompt += f"4. 主题：{topic}\n"
+        
+        if word_count:
+            prompt += f"5. 字数要求：约{word_count}词\n"
+        
+        if estimated_time:
+            prompt += f"6. 每道题预计完成时间：约{estimated_time:.0f}分钟\n"
+        
+        if count > 1:
+            prompt += f"""
+请以JSON数组格式返回{count}道题目，数组中的每个元素包含以下字段：
+"""
+        else:
+            prompt += """
+请以JSON格式返回，包含以下字段：
+"""
+        prompt += """- question: 题目内容
+- options: 选项列表（如果是选择题）
+- answer: 正确答案
+- explanation: 答案解析
+- difficulty: 难度级别
+- estimated_time: 预计完成时间（分钟）
+"""
+        
+        return prompt
+    
+    def _generate_with_ai(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """使用AI API生成题目"""
+        
+        if not self.available_platforms:
+            return None
+        
+        # 选择第一个可用的平台
+        platform_id = list(self.available_platforms.keys())[0]
+        platform_info = self.available_platforms[platform_id]
+        
+        try:
+            # 调用AI API
+            response_text = self._call_ai(platform_id, prompt)
+            
+            # 提取JSON部分（AI可能会在回答中添加额外文本）
+            result = self._extract_json(response_text)
+            if result is None:
+                return None
+            
+            # 验证必要字段，缺失或无效的字段单独补全，保留已生成的有效内容
+            invalid_fields = self._find_invalid_fields(result)
+            if invalid_fields:
+                print(f"AI响应缺少或包含无效字段 {invalid_fields}，尝试补全")
+                result = self._repair_fields(platform_id, result, invalid_fields)
+                if result is None:
+                    return None
+            
+            # 添加AI生成标记
+            result["generated_by_ai"] = True
+            result["ai_platform"] = platform_info["name"]
+            return result
+                
+        except Exception as e:
+            print(f"AI生成题目失败: {e}")
+            return None
+    
+    def _call_ai(self, platform_id: str, prompt: str) -> str:
+        """向指定平台发送一次题目生成请求"""
+        platform_info = self.available_platforms[platform_id]
+        
+        return api_utils.get_chat_response(
+            platform=platform_id,
+            api_key=platform_info["api_key"],
+            model=platform_info["default_model"],
+            messages=build_messages(prompt),
+            temperature=0.3
+        )
+    
+    def _generate_many_with_ai(self, prompt: str) -> List[Dict[str, Any]]:
+        """用一次请求生成多道题目，只返回字段完整的题目（不补全字段）"""
+        
+        if not self.available_platforms:
+            return []
+        
+        platform_id = list(self.available_platforms.keys())[0]
+        platform_info = self.available_platforms[platform_id]
+        
+        try:
+            response_text = self._call_ai(platform_id, prompt)
+        except Exception as e:
+            print(f"AI生成题目失败: {e}")
+            return []
+        
+        array_match = JSON_ARRAY_PATTERN.search(response_text or "")
+        try:
+            items = json.loads(array_match.group()) if array_match else None
+        except json.JSONDecodeError as e:
+            print(f"解析AI响应JSON失败: {e}")
+            items = None
+        if not isinstance(items, list):
+            print(f"无法从AI响应中提取JSON数组: {(response_text or '')[:200]}...")
+            return []
+        
+        results = []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            invalid_fields = self._find_invalid_fields(item)
+            if invalid_fields:
+                print(f"AI响应中的题目缺少或包含无效字段 {invalid_fields}，稍后单独生成")
+                continue
+            item["generated_by_ai"] = True
+            item["ai_platform"] = platform_info["name"]
+            results.append(item)
+        return results
+    
+    def _extract_json(self, response_text: str) -> Optional[Dict[str, Any]]:
+        """从AI响应中提取JSON对象"""
+        json_match = JSON_PATTERN.search(response_text or "")
+        if not json_match:
+            print(f"无法从AI响应中提取JSON: {(response_text or '')[:200]}...")
+            return None
+        
+        try:
+            result = json.loads(json_match.group())
+        except json.JSONDecodeError as e:
+            print(f"解析AI响应JSON失败: {e}")
+            print(f"响应内容: {response_text[:200]}...")
+            return None
+        
+        if not isinstance(result, dict):
+            print(f"AI响应不是JSON对象: {response_text[:200]}...")
+            return None
+        return result
+    
+    def parse_response(self, response_text: str) -> Optional[Dict[str, Any]]:
+        """解析并验证一次生成响应（不补全字段），无效时返回 None"""
+        result = self._extract_json(response_text)
+        if result is None:
+            return None
+        invalid_fields = self._find_invalid_fields(result)
+        if invalid_fields:
+            print(f"AI响应缺少或包含无效字段 {invalid_fields}")
+            return None
+        return result
+    
+    def _find_invalid_fields(self, result: Dict[str, Any]) -> List[str]:
+        """返回缺失或取值无效的必要字段"""
+        invalid = []
+        for field in REQUIRED_FIELDS:
+            value = result.get(field)
+            if value is None or (isinstance(value, str) and not value.strip()):
+                invalid.append(field)
+            elif field == "estimated_time" and not _is_positive_number(value):
+                invalid.append(field)
+        
+        # 选项如果存在必须是非空列表或 {字母: 内容} 字典（字典在构建题目时转换为列表）；
+        # 由已有题目（Question.to_dict）重新生成字段时选项是元组
+        options = result.get("options")
+        if options is not None and not (isinstance(options, (list, tuple, dict)) and options):
+            invalid.append("options")
+        return invalid
+    
+    def _build_repair_prompt(self, partial: Dict[str, Any], fields: List[str]) -> str:
+        """构建只补全指定字段的提示词"""
+        context = {k: v for k, v in partial.items() if k not in fields and k in QUESTION_FIELDS}
+        field_lines = "\n".join(f"- {field}: {FIELD_DESCRIPTIONS.get(field, field)}" for field in fields)
+        
+        return f"""以下是一道已经生成的英语考试题目（JSON格式）：
+
+{json.dumps(context, ensure_ascii=False, indent=2)}
+
+请基于这道题目，只生成以下字段，不要修改或重复其他字段：
+{field_lines}
+
+请以JSON格式返回，只包含上述字段。
+"""
+    
+    def _repair_fields(self,
+                       platform_id: str,
+                       partial: Dict[str, Any],
+                       fields: List[str]) -> Optional[Dict[str, Any]]:
+        """只重新生成缺失或无效的字段，并与已有字段合并"""
+        if "question" in fields:
+            # 题干本身缺失时没有可用的上下文，补全没有意义
+            return None
+        
+        prompt = self._build_repair_prompt(partial, fields)
+        try:
+            patch = self._extract_json(self._call_ai(platform_id, prompt))
+        except Exception as e:
+            print(f"补全字段 {fields} 失败: {e}")
+            return None
+        if patch is None:
+            return None
+        
+        result = dict(partial)
+        for field in fields:
+            if field in patch:
+                result[field] = patch[field]
+        
+        still_invalid = self._find_invalid_fields(result)
+        if still_invalid:
+            print(f"补全后仍有无效字段: {still_invalid}")
+            return None
+        
+        result["repaired_fields"] = sorted(set(result.get("repaired_fields", [])) | set(fields))
+        return result
+    
+    def regenerate_fields(self, question: Question, fields: List[str]) -> Question:
+        """只重新生成题目的指定字段（如解析或选项），其余内容保持不变"""
+        
+        if not self.available_platforms:
+            raise RuntimeError("没有可用的AI平台，无法重新生成字段")
+        
+        platform_id = list(self.available_platforms.keys())[0]
+        result = self._repair_fields(platform_id, question.to_dict(), list(fields))
+        if result is None:
+            raise RuntimeError(f"重新生成字段失败: {', '.join(fields)}")
+        
+        params = {
+            "exam_type": question.exam_type,
+            "question_type": question.question_type,
+            "subtype": question.subtype,
+            "difficulty": question.difficulty,
+            "topic": question.topic
+        }
+        updated = Question.from_generated(result, params).replace(
+            id=question.id,
+            generated_at=question.generated_at
+        )
+        question_store.add(updated)
+        return updated
+    
+    def generate_questions(self,
+                           exam_type: str,
+                           question_type: str,
+                           subtype: str,
+                           difficulty: str,
+                           topic: Optional[str] = None,
+                           count: int = 1,
+                           estimated_time: Optional[float] = None,
+                           session_id: Optional[str] = None) -> List[Question]:
+        """用一次请求生成多道参数相同的题目；无效、未通过本地评分或数量不足的部分再逐道生成"""
+        
+        params = {
+            "exam_type": exam_type,
+            "question_type": question_type,
+            "subtype": subtype,
+            "difficulty": difficulty,
+            "topic": topic
+        }
+        
+        questions = []
+        if count > 1:
+            prompt = self._build_prompt(exam_type, question_type, subtype, difficulty, topic, None,
+                                        count=count, estimated_time=estimated_time)
+            for result in self._generate_many_with_ai(prompt)[:count]:
+                question = Question.from_generated(result, params)
+                issues = self.check_question(question, result.get("difficulty"))
+                if issues:
+                    print(f"AI生成的题目未通过本地评分: {'；'.join(issues)}")
+                    continue
+                question_store.add(question)
+                questions.append(question)
+        
+        while len(questions) < count:
+            questions.append(self.generate_question(session_id=session_id, **params))
+        return questions
+    
+    def generate_question_set(self,
+                            exam_type: str,
+                            question_types: List[str],
+                            count_per_type: int = 5,
+                            difficulty: str = "medium",
+                            topic: Optional[str] = None,
+                            target_time: Optional[float] = None,
+                            exclude_ids: Optional[List[str]] = None,
+                            reuse: bool = True) -> QuestionSet:
+        """生成一套题目集：先复用题目库中合适的题目，剩下的位置按参数分组批量生成"""
+        
+        plan = self.plan_question_set(exam_type, question_types, count_per_type, difficulty, topic,
+                                      target_time, exclude_ids, reuse)
+        
+        for batch in plan.batches(self.set_batch_size):
+            plan.fill(batch, self.generate_batch(plan, batch))
+        
+        question_set = self.new_question_set(exam_type, difficulty, topic)
+        question_set.questions = plan.questions()
+        
+        # 生成摘要
+        question_set.summary = self.summarize_set(question_set.questions, question_types, difficulty,
+                                                  reused=plan.reused_count)
+        
+        return question_set
+    
+    @property
+    def set_batch_size(self) -> int:
+        """生成题目集时一次请求最多生成的题目数"""
+        return max(1, int(config.get("set_batch_size", 5)))
+    
+    def plan_question_set(self,
+                          exam_type: str,
+                          question_types: List[str],
+                          count_per_type: int = 5,
+                          difficulty: str = "medium",
+                          topic: Optional[str] = None,
+                          target_time: Optional[float] = None,
+                          exclude_ids: Optional[List[str]] = None,
+                          reuse: bool = True) -> SetPlan:
+        """列出题目集的每个位置，并尽量用题目库中已有的题目填充（不调用平台）"""
+        return plan_question_set(
+            exam_type,
+            difficulty,
+            self.set_items(question_types, count_per_type),
+            topic=topic,
+            target_time=target_time,
+            exclude_ids=exclude_ids or (),
+            reuse=reuse
+        )
+    
+    def generate_batch(self, plan: SetPlan, batch: GenerationBatch) -> List[Question]:
+        """生成规划中的一组位置"""
+        return self.generate_questions(
+            exam_type=plan.exam_type,
+            question_type=batch.question_type,
+            subtype=batch.subtype,
+            difficulty=plan.difficulty,
+            topic=batch.topic,
+            count=len(batch.slots),
+            estimated_time=plan.slot_time()
+        )
+    
+    def set_items(self, question_types: List[str], count_per_type: int) -> List[Dict[str, str]]:
+        """列出题目集中每道题的题目类型和子类型（每种题目类型轮流使用各个子类型）"""
+        items = []
+        for qtype in question_types:
+            subtypes = self.question_types.get(qtype, {}).get("subtypes", [""])
+            for i in range(count_per_type):
+                items.append({"question_type": qtype, "subtype": subtypes[i % len(subtypes)]})
+        return items
+    
+    def new_question_set(self, exam_type: str, difficulty: str, topic: Optional[str]) -> QuestionSet:
+        return QuestionSet(exam_type=ExamType(exam_type), difficulty=Difficulty(difficulty), topic=topic)
+    
+    def summarize_set(self,
+                      questions: List[Question],
+                      question_types: List[str],
+                      difficulty: str,
+                      reused: int = 0) -> QuestionSetSummary:
+        """生成题目集摘要"""
+        return QuestionSetSummary(
+            total_questions=len(questions),
+            total_estimated_time=sum(q.estimated_time for q in questions),
+            question_types=[QuestionType(qtype) for qtype in question_types],
+            average_difficulty=Difficulty(difficulty),
+            reused_questions=reused,
+            generated_questions=len(questions) - reused
+        )
+    
+    def save_question_set(self, question_set: QuestionSet, filename: Optional[str] = None) -> str:
+        """保存题目集到文件"""
+        
+        if not filename:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            exam_type = question_set.exam_type.value
+            filename = f"data/question_set_{exam_type}_{timestamp}.json"
+        
+        # 确保目录存在
+        import os
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(question_set.to_dict(), f, ensure_ascii=False, indent=2)
+        
+        return filename
+
+
+_instance: Optional[QuestionGenerator] = None
+_instance_lock = threading.Lock()
+
+
+def get_question_generator() -> QuestionGenerator:
+    """获取单例实例（第一次调用时创建）"""
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = QuestionGenerator()
+    return _instance
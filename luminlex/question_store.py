@@ -0,0 +1,287 @@
+import threading
+from collections import OrderedDict, deque
+from typing import Collection, Deque, Dict, List, Optional, Tuple
+
+import msgspec
+
+from luminlex import config
+from luminlex.models import Difficulty, ExamType, Question, QuestionType
+from luminlex.shared_state import SharedState, get_shared_state
+
+# 共享状态中保存题目索引记录的日志
+STREAM = "questions"
+# 共享状态中保存题目内容的键前缀
+BODY_PREFIX = "question:"
+# 压缩日志时使用的锁
+COMPACT_LOCK = "questions_compacting"
+
+# 进程内缓存的题目数，以及每个 (考试类型, 题目类型, 子类型, 难度) 索引保留的最近题目数
+CACHE_SIZE = 2000
+INDEX_SIZE = 5000
+# 题目库保留的最多题目数（配置项 question_store_size），每写入 COMPACT_EVERY 条记录压缩一次
+MAX_QUESTIONS = 50000
+COMPACT_EVERY = 1000
+# 每次从共享日志读取的记录数
+SYNC_PAGE = 1000
+
+
+class _Record(msgspec.Struct, kw_only=True, omit_defaults=True):
+    """
+    日志中的一条索引记录（replaced 表示替换了已有的题目）。
+    除索引键外还带有常用的筛选条件（主题、是否由 AI 生成），查找时先按记录筛选，不必读取题目内容。
+    """
+    id: str
+    exam_type: ExamType
+    question_type: QuestionType
+    subtype: str
+    difficulty: Difficulty
+    topic: Optional[str] = None
+    generated_by_ai: bool = False
+    replaced: bool = False
+
+    @classmethod
+    def of(cls, question: Question, replaced: bool = False) -> "_Record":
+        return cls(
+            id=question.id,
+            exam_type=question.exam_type,
+            question_type=question.question_type,
+            subtype=question.subtype,
+            difficulty=question.difficulty,
+            topic=question.topic,
+            generated_by_ai=question.generated_by_ai,
+            replaced=replaced
+        )
+
+
+_record_decoder = msgspec.json.Decoder(_Record)
+
+
+class QuestionStore:
+    """
+    已生成题目的存储，按 id 查找，并按 (考试类型, 题目类型, 子类型, 难度) 建立索引。
+    题目内容按 id 保存在共享状态中，同时向共享日志追加一条索引记录，所有副本共用；
+    每次访问前读取其他副本新写入的记录。进程内只保留每个索引最近的 index_size 条记录
+    和最近使用的 cache_size 道题目，其余题目按 id 从共享状态读取，内存占用不随题目数增长。
+    共享日志只保留最新的 max_questions 条记录，更早的题目连同内容一起删除，
+    新启动的副本读取的记录数和共享状态的大小都不随累计生成的题目数增长。
+    读写共享状态时不持有进程内索引的锁，慢查询不会阻塞其他线程保存题目。
+    """
+
+    def __init__(self,
+                 state: Optional[SharedState] = None,
+                 cache_size: int = CACHE_SIZE,
+                 index_size: int = INDEX_SIZE,
+                 max_questions: Optional[int] = None):
+        self._state = state
+        self.cache_size = cache_size
+        self.index_size = index_size
+        self._max_questions = max_questions
+        # _lock 保护进程内的索引和缓存；_sync_lock 保证同一时间只有一个线程读取共享日志
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._cache: "OrderedDict[str, Question]" = OrderedDict()
+        self._index: Dict[Tuple, Deque[_Record]] = {}
+        self._count = 0
+        self._seq = 0
+
+    @property
+    def state(self) -> SharedState:
+        return self._state or get_shared_state()
+
+    @property
+    def max_questions(self) -> int:
+        if self._max_questions is not None:
+            return self._max_questions
+        return int(config.get("question_store_size", MAX_QUESTIONS))
+
+    @staticmethod
+    def index_key(question) -> Tuple:
+        return (question.exam_type, question.question_type, question.subtype, question.difficulty)
+
+    def add(self, question: Question) -> str:
+        """保存题目（相同 id 的题目会被替换），返回题目 id"""
+        self._sync()
+        try:
+            replaced = self.state.get(BODY_PREFIX + question.id) is not None
+            self.state.set(BODY_PREFIX + question.id, question.to_json())
+            seq = self.state.append(STREAM, msgspec.json.encode(_Record.of(question, replaced)))
+        except Exception as e:
+            print(f"保存题目失败: {e}")
+            with self._lock:
+                if question.id not in self._cache:
+                    self._insert(_Record.of(question))
+                self._remember(question)
+            return question.id
+
+        self._sync()
+        with self._lock:
+            self._remember(question)
+        if seq % COMPACT_EVERY == 0:
+            self.compact()
+        return question.id
+
+    def get(self, question_id: str) -> Optional[Question]:
+        """按 id 查找题目"""
+        self._sync()
+        return self._load(question_id)
+
+    def find(self,
+             exam_type: Optional[str] = None,
+             question_type: Optional[str] = None,
+             subtype: Optional[str] = None,
+             difficulty: Optional[str] = None,
+             limit: int = 20,
+             topic: Optional[str] = None,
+             generated_by_ai: Optional[bool] = None,
+             exclude_ids: Collection[str] = ()) -> List[Question]:
+        """
+        按生成参数查找题目（较新的在前），未指定的条件不做限制。
+        主题、是否由 AI 生成和排除的 id 按索引记录筛选，不满足的题目不读取内容、不计入 limit。
+        """
+        wanted = (exam_type, question_type, subtype, difficulty)
+        self._sync()
+        matched = []
+        with self._lock:
+            for key, records in self._index.items():
+                if any(w is not None and w != k for w, k in zip(wanted, key)):
+                    continue
+                for record in reversed(records):
+                    if (record.id in exclude_ids
+                            or (topic is not None and record.topic != topic)
+                            or (generated_by_ai is not None and record.generated_by_ai != generated_by_ai)):
+                        continue
+                    matched.append(record.id)
+
+        # 读取题目内容时不持有锁；已被压缩删除的题目跳过
+        results = []
+        for question_id in dict.fromkeys(matched):
+            question = self._load(question_id)
+            if question is None:
+                continue
+            results.append(question)
+            if len(results) >= limit:
+                break
+        return results
+
+    def compact(self) -> int:
+        """
+        只保留共享日志中最新的 max_questions 条记录，删除其余题目的内容，返回删除的题目数。
+        多个副本中同一时间只有一个执行；其他副本内存索引中已删除的题目在查找时跳过。
+        """
+        try:
+            if not self.state.set_if_absent(COMPACT_LOCK, b"1", ttl=300):
+                return 0
+        except Exception as e:
+            print(f"压缩题目库失败: {e}")
+            return 0
+        try:
+            removed = set()
+            for value in self.state.trim(STREAM, self.max_questions):
+                try:
+                    removed.add(_record_decoder.decode(value).id)
+                except (msgspec.DecodeError, msgspec.ValidationError):
+                    continue
+            # 被替换过的题目在保留的记录中还有一条，内容仍在使用
+            seq = 0
+            while removed:
+                records = self.state.read_since(STREAM, seq, SYNC_PAGE)
+                for seq, value in records:
+                    try:
+                        removed.discard(_record_decoder.decode(value).id)
+                    except (msgspec.DecodeError, msgspec.ValidationError):
+                        continue
+                if len(records) < SYNC_PAGE:
+                    break
+            for question_id in removed:
+                self.state.delete(BODY_PREFIX + question_id)
+            with self._lock:
+                for question_id in removed:
+                    self._cache.pop(question_id, None)
+            return len(removed)
+        except Exception as e:
+            print(f"压缩题目库失败: {e}")
+            return 0
+        finally:
+            try:
+                self.state.delete(COMPACT_LOCK)
+            except Exception:
+                pass
+
+    def __len__(self) -> int:
+        self._sync()
+        with self._lock:
+            return self._count
+
+    def _load(self, question_id: str) -> Optional[Question]:
+        """从进程内缓存或共享状态读取题目"""
+        with self._lock:
+            question = self._cache.get(question_id)
+            if question is not None:
+                self._cache.move_to_end(question_id)
+                return question
+        try:
+            value = self.state.get(BODY_PREFIX + question_id)
+        except Exception as e:
+            print(f"读取题目 {question_id} 失败: {e}")
+            return None
+        if value is None:
+            return None
+        try:
+            question = Question.from_json(value)
+        except (msgspec.DecodeError, msgspec.ValidationError) as e:
+            print(f"跳过无法解析的题目 {question_id}: {e}")
+            return None
+        with self._lock:
+            self._remember(question)
+        return question
+
+    def _remember(self, question: Question):
+        """放入进程内缓存，超出容量时丢弃最久未使用的题目（调用方需持有锁）"""
+        self._cache[question.id] = question
+        self._cache.move_to_end(question.id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _insert(self, record: _Record):
+        """写入内存索引（调用方需持有锁）"""
+        records = self._index.get(self.index_key(record))
+        if record.replaced:
+            # 缓存中的旧版本不再有效
+            self._cache.pop(record.id, None)
+            # 被替换的题目通常已在索引中，更新筛选条件；原记录已被压缩删除时按新题目加入
+            if records is not None:
+                for i, existing in enumerate(records):
+                    if existing.id == record.id:
+                        records[i] = record
+                        return
+        self._count += 1
+        if records is None:
+            records = self._index[self.index_key(record)] = deque(maxlen=self.index_size)
+        records.append(record)
+
+    def _sync(self):
+        """分页读取共享日志中尚未加载的记录（读取时不持有 _lock）"""
+        with self._sync_lock:
+            while True:
+                try:
+                    page = self.state.read_since(STREAM, self._seq, SYNC_PAGE)
+                except Exception as e:
+                    print(f"读取题目库失败: {e}")
+                    return
+                records = []
+                for _, value in page:
+                    try:
+                        records.append(_record_decoder.decode(value))
+                    except (msgspec.DecodeError, msgspec.ValidationError) as e:
+                        print(f"跳过无法解析的题目记录: {e}")
+                with self._lock:
+                    for record in records:
+                        self._insert(record)
+                if page:
+                    self._seq = page[-1][0]
+                if len(page) < SYNC_PAGE:
+                    return
+
+
+# 单例实例
+question_store = QuestionStore()
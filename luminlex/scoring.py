@@ -0,0 +1,486 @@
+"""
+本地评分
+
+不调用平台，在本地检查生成的题目：
+- 结构：选择题的选项数量、选项是否重复、答案字母是否在选项中
+- 难度：按分级词表统计英文部分的词汇难度，结合平均句长和 Flesch-Kincaid 年级估计难度分（0-1），
+  与题目标注的难度对应的范围比较
+
+分级词表是按字母排序的定宽字符串数组和对应的级别数组，保存为 .npy 文件并以内存映射方式加载，
+查词用 searchsorted 一次完成；一组题目的所有单词合并成一个数组计算，
+一套题目不到 1 毫秒，上万道题的题目库约 0.4 秒（python -m luminlex.scoring 查看题目库的评分分布和耗时）。
+
+词表第一次使用时由种子词表 vocabulary.txt 生成到数据目录的 vocabulary/ 下，种子词表修改后自动重新生成；
+可以用 scripts/build_vocabulary.py 合并完整的考试大纲词表重新生成。
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import msgspec
+import numpy as np
+
+from luminlex import config
+from luminlex.models import Difficulty, Question, QuestionType
+
+SEED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vocabulary.txt")
+VOCABULARY_DIR = os.path.join(config.DATA_DIR, "vocabulary")
+
+# 词表中的级别：1 基础 / 2 四级 / 3 六级 / 4 专业与学术，未收录的词（专有名词、罕见词等）记为 5
+UNKNOWN_LEVEL = 5
+# 各级别单词对词汇难度的贡献（下标为级别）
+LEVEL_WEIGHTS = np.array([0.0, 0.0, 0.35, 0.7, 1.0, 0.8])
+
+# 英文单词少于该数量时（如中文题干的写作题）不估计难度，只做结构检查
+MIN_WORDS = 20
+
+# 各难度允许的难度分范围；相邻难度有重叠，只拒绝明显不符的题目
+DIFFICULTY_BANDS: Dict[Difficulty, Tuple[float, float]] = {
+    Difficulty.EASY: (0.0, 0.4),
+    Difficulty.MEDIUM: (0.12, 0.8),
+    Difficulty.HARD: (0.35, 1.0),
+}
+
+# 难度分各项的归一化区间（低于下限记 0，高于上限记 1）和权重
+_LEXICAL_RANGE = (0.05, 0.45)
+_GRADE_RANGE = (2.0, 16.0)
+_SENTENCE_RANGE = (6.0, 30.0)
+_WEIGHTS = (0.5, 0.3, 0.2)
+
+# 需要选项的题目类型，以及各子类型允许的选项数量
+CHOICE_TYPES = {QuestionType.LISTENING, QuestionType.READING}
+OPTION_COUNTS = {"true_false": (2, 3), "matching": (3, 8)}
+DEFAULT_OPTION_COUNT = (3, 5)
+
+TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+# 批量分词时分隔各段文本；同一次扫描中记下句末标点，用于统计句子数
+_SEPARATOR = "\x01"
+_CHUNK_TOKEN_PATTERN = re.compile(TOKEN_PATTERN.pattern + r"|\x01|[.!?]+(?=[\s\x01])|[。！？]")
+# 选项前的字母标签（"A. "、"(B)"、"C、"）
+OPTION_LABEL_PATTERN = re.compile(r"^\s*[\(（]?([A-Ha-h])\s*[\.\)）．、:：]\s*")
+# 答案开头的选项字母（"B"、"B 错误"、"(C) ..."）
+ANSWER_LABEL_PATTERN = re.compile(r"^\s*[\(（]?([A-H])(?![A-Za-z])")
+# 只由字母、题号和标点组成的答案（"B"、"A, C"、"1. A 2. D"）
+LETTER_ANSWER_PATTERN = re.compile(r"[\sA-H\d\.\(\)（）,，、;；:：/-]+")
+# 答案前常见的说明文字（"答案：B"、"选B"、"Option B"、"The correct answer is B"）
+ANSWER_PREFIX_PATTERN = re.compile(
+    r"^\s*(?:(?:正确)?答案(?:是|为)?|选项|选择|选|(?:the\s+)?(?:correct\s+)?(?:answer|option|choice)(?:\s+is)?)"
+    r"\s*[:：]?\s*",
+    re.IGNORECASE
+)
+# 以小写选项字母开头的答案（"b"、"(b)"、"b. ..."）
+LOWER_LETTER_ANSWER_PATTERN = re.compile(r"^([\(（]?)([a-h])(?=$|[\)）\.．、:：])")
+
+# 查不到的单词依次尝试还原为原形：(后缀, 替换)
+_SUFFIX_RULES = (
+    ("n't", ""), ("'s", ""), ("'re", ""), ("'ve", ""), ("'ll", ""), ("'d", ""), ("'m", ""),
+    ("iness", "y"), ("iest", "y"), ("ier", "y"), ("ies", "y"), ("ied", "y"), ("ily", "y"),
+    ("ally", ""), ("ness", ""), ("ing", ""), ("ing", "e"), ("est", ""), ("est", "e"),
+    ("ed", ""), ("ed", "e"), ("er", ""), ("er", "e"), ("ly", ""), ("ly", "le"), ("es", ""), ("s", ""),
+)
+_DOUBLED_SUFFIXES = ("ing", "ed", "er", "est")
+
+_VOWELS = np.array([ord(c) for c in "aeiouy"], dtype=np.uint32)
+
+
+class QuestionScore(msgspec.Struct, frozen=True):
+    """一道题的本地评分"""
+    words: int
+    difficulty: Optional[float]
+    advanced_ratio: float
+    grade: float
+    sentence_length: float
+    issues: Tuple[str, ...] = ()
+
+    @property
+    def accepted(self) -> bool:
+        return not self.issues
+
+
+def _stems(word: str) -> List[str]:
+    """单词可能的原形"""
+    stems = []
+    for suffix, replacement in _SUFFIX_RULES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            stem = word[:-len(suffix)]
+            stems.append(stem + replacement)
+            # running -> run, stopped -> stop
+            if (suffix in _DOUBLED_SUFFIXES and not replacement
+                    and len(stem) >= 3 and stem[-1] == stem[-2] and stem[-1] not in "aeiouls"):
+                stems.append(stem[:-1])
+    return stems
+
+
+def count_syllables(words: np.ndarray) -> np.ndarray:
+    """估计每个单词的音节数（元音字母组数，词尾不发音的 e 不计），至少为 1"""
+    if not len(words):
+        return np.zeros(0, dtype=np.int64)
+    words = np.ascontiguousarray(words)
+    width = words.dtype.itemsize // 4
+    codes = words.view(np.uint32).reshape(len(words), width)
+    vowel = np.isin(codes, _VOWELS)
+    groups = vowel.copy()
+    groups[:, 1:] &= ~vowel[:, :-1]
+    counts = groups.sum(axis=1)
+
+    lengths = (codes != 0).sum(axis=1)
+    rows = np.arange(len(words))
+    last = codes[rows, np.maximum(lengths - 1, 0)]
+    before_last = codes[rows, np.maximum(lengths - 2, 0)]
+    silent_e = (last == ord("e")) & (before_last != ord("l")) & (counts > 1)
+    return np.maximum(counts - silent_e, 1)
+
+
+class Vocabulary:
+    """分级词表：排序的单词数组和对应的级别"""
+
+    def __init__(self, words: np.ndarray, levels: np.ndarray):
+        self.words = words
+        self.levels = levels
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @classmethod
+    def load(cls, directory: str = VOCABULARY_DIR) -> "Vocabulary":
+        """以内存映射方式加载词表（多个进程共享同一份页缓存）"""
+        return cls(
+            np.load(os.path.join(directory, "words.npy"), mmap_mode="r"),
+            np.load(os.path.join(directory, "levels.npy"), mmap_mode="r")
+        )
+
+    @classmethod
+    def build(cls,
+              entries: Dict[str, int],
+              directory: str = VOCABULARY_DIR,
+              source: Optional[Dict[str, Any]] = None) -> "Vocabulary":
+        """
+        由 {单词: 级别} 生成词表文件并加载。
+        source 记录词表的来源（种子词表的摘要、额外的词表），用于判断种子词表修改后是否需要重新生成。
+        """
+        os.makedirs(directory, exist_ok=True)
+        words = sorted(entries)
+        width = max(len(word) for word in words)
+        arrays = {
+            "words": np.array(words, dtype=f"<U{width}"),
+            "levels": np.array([entries[word] for word in words], dtype=np.uint8)
+        }
+        for name, array in arrays.items():
+            # 先写临时文件再替换，其他进程不会读到半个文件
+            path = os.path.join(directory, f"{name}.npy")
+            tmp_path = os.path.join(directory, f"{name}.{os.getpid()}.tmp.npy")
+            np.save(tmp_path, array)
+            os.replace(tmp_path, path)
+        tmp_path = os.path.join(directory, f"source.{os.getpid()}.tmp.json")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(source or {}, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(directory, "source.json"))
+        return cls.load(directory)
+
+    @staticmethod
+    def read_source(directory: str = VOCABULARY_DIR) -> Optional[Dict[str, Any]]:
+        """读取词表的来源记录，没有记录（旧版本生成的词表）时返回 None"""
+        try:
+            with open(os.path.join(directory, "source.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _find(self, words: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """返回每个单词在词表中的位置和是否收录"""
+        positions = np.minimum(np.searchsorted(self.words, words), len(self.words) - 1)
+        return positions, self.words[positions] == words
+
+    def levels_of(self, words: np.ndarray) -> np.ndarray:
+        """查询一组单词的级别（小写），未收录的按变化形式还原后再查，仍查不到时为 UNKNOWN_LEVEL"""
+        positions, found = self._find(words)
+        levels = np.where(found, self.levels[positions], UNKNOWN_LEVEL).astype(np.uint8)
+
+        missing = np.flatnonzero(~found)
+        candidates, owners = [], []
+        for i in missing:
+            stems = _stems(str(words[i]))
+            candidates.extend(stems)
+            owners.extend([i] * len(stems))
+        if candidates:
+            owners = np.array(owners)
+            positions, found = self._find(np.array(candidates))
+            # 多个候选原形都收录时取最低的级别
+            np.minimum.at(levels, owners[found], self.levels[positions[found]])
+        return levels
+
+
+def read_word_list(path: str, level: Optional[int] = None) -> Dict[str, int]:
+    """
+    读取词表文件，返回 {单词: 级别}。
+    指定 level 时每行第一列为一个单词（考试大纲词表的常见格式）；
+    否则按种子词表的格式读取（"## level N" 之后每行若干个单词）。
+    """
+    entries: Dict[str, int] = {}
+    current = level
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if level is None and line.startswith("## level"):
+                current = int(line.split()[2])
+                continue
+            if not line or line.startswith("#") or current is None:
+                continue
+            words = line.split()[:1] if level is not None else line.split()
+            for word in words:
+                word = word.lower()
+                if TOKEN_PATTERN.fullmatch(word):
+                    entries[word] = min(current, entries.get(word, current))
+    return entries
+
+
+def seed_digest(path: str = SEED_PATH) -> str:
+    """种子词表的摘要"""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def merge_word_lists(*lists: Dict[str, int]) -> Dict[str, int]:
+    """合并多个词表，同一单词取最低的级别"""
+    merged: Dict[str, int] = {}
+    for entries in lists:
+        for word, level in entries.items():
+            merged[word] = min(level, merged.get(word, level))
+    return merged
+
+
+def _normalize(values: np.ndarray, bounds: Tuple[float, float]) -> np.ndarray:
+    low, high = bounds
+    return np.clip((values - low) / (high - low), 0.0, 1.0)
+
+
+def _split_options(options: Sequence[str]) -> Tuple[List[Optional[str]], List[str]]:
+    """选项的字母标签（没有时为 None）和内容"""
+    labels, bodies = [], []
+    for option in options:
+        match = OPTION_LABEL_PATTERN.match(option)
+        labels.append(match.group(1).upper() if match else None)
+        bodies.append(option[match.end():] if match else option)
+    return labels, bodies
+
+
+def normalize_answer(answer: str) -> str:
+    """去掉答案前的说明文字，开头的小写选项字母转换为大写"""
+    answer = ANSWER_PREFIX_PATTERN.sub("", answer.strip(), count=1).strip() or answer.strip()
+    return LOWER_LETTER_ANSWER_PATTERN.sub(lambda m: m.group(1) + m.group(2).upper(), answer, count=1)
+
+
+def structural_issues(question: Question) -> List[str]:
+    """检查选项和答案是否对应"""
+    return _structural_issues(question, *_split_options(question.options or ()))
+
+
+def _structural_issues(question: Question, labels: List[Optional[str]], bodies: List[str]) -> List[str]:
+    if not bodies:
+        if question.question_type in CHOICE_TYPES:
+            return ["选择题缺少选项"]
+        return []
+
+    issues = []
+    low, high = OPTION_COUNTS.get(question.subtype, DEFAULT_OPTION_COUNT)
+    if not low <= len(bodies) <= high:
+        issues.append(f"选项数量为 {len(bodies)}，应为 {low}-{high} 个")
+
+    normalized = [body.strip().lower() for body in bodies]
+    if len(set(normalized)) < len(normalized):
+        issues.append("选项重复")
+    letters = labels if all(labels) else list("ABCDEFGH"[:len(bodies)])
+
+    answer = normalize_answer(question.answer)
+    if len(answer) == 1 and answer in "ABCDEFGH":
+        chosen = [answer]
+    elif LETTER_ANSWER_PATTERN.fullmatch(answer) and re.search(r"[A-H]", answer):
+        chosen = re.findall(r"[A-H]", answer)
+    else:
+        label = ANSWER_LABEL_PATTERN.match(answer)
+        if label:
+            chosen = [label.group(1)]
+        elif answer.lower() in normalized:
+            chosen = []
+        else:
+            issues.append("答案与选项不对应")
+            return issues
+    missing = sorted(set(chosen) - set(letters))
+    if missing:
+        issues.append(f"答案 {', '.join(missing)} 不在选项中")
+    return issues
+
+
+class Scorer:
+    """按分级词表批量评分"""
+
+    def __init__(self,
+                 vocabulary: Vocabulary,
+                 bands: Optional[Dict[Difficulty, Tuple[float, float]]] = None,
+                 min_words: int = MIN_WORDS):
+        self.vocabulary = vocabulary
+        self.bands = bands or DIFFICULTY_BANDS
+        self.min_words = min_words
+
+    def score(self, question: Question) -> QuestionScore:
+        return self.score_many([question])[0]
+
+    def score_many(self, questions: Sequence[Question]) -> List[QuestionScore]:
+        """评分一组题目：所有单词合并成一个数组查词和计算音节，再按题目汇总"""
+        count = len(questions)
+        if not count:
+            return []
+        # 参与难度估计的文本：正文（题干，汉译英题加上参考译文）和各个选项的内容
+        options = [_split_options(question.options or ()) for question in questions]
+        proses = []
+        for question in questions:
+            prose = question.question
+            if question.subtype == "chinese_to_english":
+                prose += "\n" + question.answer
+            proses.append(prose)
+
+        # 所有文本拼接后一次分词，每道题的正文和选项之后各有一个分隔符
+        chunks = []
+        for prose, (_, bodies) in zip(proses, options):
+            chunks.append(prose)
+            chunks.append("\n".join(bodies))
+        tokens = _CHUNK_TOKEN_PATTERN.findall((_SEPARATOR.join(chunks) + _SEPARATOR).lower())
+
+        # 相同的单词只查一次
+        token_ids = {token: i for i, token in enumerate(dict.fromkeys(tokens))}
+        ids = np.fromiter(map(token_ids.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+        separator = token_ids[_SEPARATOR]
+        is_sentence_end = np.array([not token[0].isalpha() and token != _SEPARATOR for token in token_ids])[ids]
+        is_word = (ids != separator) & ~is_sentence_end
+
+        # 每段文本的单词数和句末标点数（每段末尾是一个分隔符）
+        boundaries = np.flatnonzero(ids == separator)
+        chunk_words = np.diff(np.cumsum(is_word)[boundaries], prepend=0)
+        chunk_ends = np.diff(np.cumsum(is_sentence_end)[boundaries], prepend=0)
+        prose_words = chunk_words[0::2]
+        words = prose_words + chunk_words[1::2]
+        sentences = np.maximum(chunk_ends[0::2], 1)
+        ids = ids[is_word]
+
+        unique = np.array(list(token_ids))
+        levels = self.vocabulary.levels_of(unique)[ids]
+        syllables = count_syllables(unique)[ids]
+
+        # 词汇难度统计全部单词，句长和年级只统计正文（选项通常不是完整的句子）
+        segments = np.repeat(np.arange(count), words)
+        offsets = np.arange(len(segments)) - np.repeat(np.cumsum(words) - words, words)
+        in_prose = offsets < np.repeat(prose_words, words)
+        per_word = np.maximum(words, 1)
+        lexical = np.bincount(segments, LEVEL_WEIGHTS[levels], minlength=count) / per_word
+        advanced = np.bincount(segments, levels >= 3, minlength=count) / per_word
+        syllables_per_word = (np.bincount(segments, syllables * in_prose, minlength=count)
+                              / np.maximum(prose_words, 1))
+
+        sentence_length = prose_words / sentences
+        grade = np.maximum(0.39 * sentence_length + 11.8 * syllables_per_word - 15.59, 0.0)
+        difficulty = (_WEIGHTS[0] * _normalize(lexical, _LEXICAL_RANGE)
+                      + _WEIGHTS[1] * _normalize(grade, _GRADE_RANGE)
+                      + _WEIGHTS[2] * _normalize(sentence_length, _SENTENCE_RANGE))
+
+        scores = []
+        columns = zip(words.tolist(), difficulty.round(3).tolist(), advanced.round(3).tolist(),
+                      grade.round(1).tolist(), sentence_length.round(1).tolist())
+        for question, (labels, bodies), (word_count, value, advanced_ratio, grade_value, length) in zip(
+                questions, options, columns):
+            issues = _structural_issues(question, labels, bodies)
+            if word_count < self.min_words:
+                value = None
+            else:
+                level = Difficulty(question.difficulty)
+                low, high = self.bands[level]
+                if not low <= value <= high:
+                    issues.append(f"难度分 {value:.2f} 不在「{level.value}」的范围 {low:.2f}-{high:.2f} 内")
+            scores.append(QuestionScore(
+                words=word_count,
+                difficulty=value,
+                advanced_ratio=advanced_ratio,
+                grade=grade_value,
+                sentence_length=length,
+                issues=tuple(issues)
+            ))
+        return scores
+
+
+_vocabulary: Optional[Vocabulary] = None
+_scorer: Optional[Scorer] = None
+_instance_lock = threading.Lock()
+
+
+def get_vocabulary() -> Vocabulary:
+    """
+    加载数据目录中的词表。不存在，或由种子词表生成后种子词表有修改时，由种子词表重新生成；
+    合并了额外词表的词表不会自动重新生成（额外的词表不一定还在），只提示重新运行 scripts/build_vocabulary.py。
+    """
+    global _vocabulary
+    if _vocabulary is None:
+        with _instance_lock:
+            if _vocabulary is None:
+                digest = seed_digest()
+                source = Vocabulary.read_source()
+                if not os.path.exists(os.path.join(VOCABULARY_DIR, "words.npy")) or source is None:
+                    Vocabulary.build(read_word_list(SEED_PATH), source={"seed": digest, "extra": []})
+                elif source.get("seed") not in (None, digest):
+                    if source.get("extra"):
+                        print("种子词表已修改，请重新运行 scripts/build_vocabulary.py 生成词表")
+                    else:
+                        Vocabulary.build(read_word_list(SEED_PATH), source={"seed": digest, "extra": []})
+                _vocabulary = Vocabulary.load()
+    return _vocabulary
+
+
+def get_scorer() -> Scorer:
+    """获取单例实例（第一次调用时加载词表）"""
+    global _scorer
+    if _scorer is None:
+        vocabulary = get_vocabulary()
+        with _instance_lock:
+            if _scorer is None:
+                _scorer = Scorer(vocabulary)
+    return _scorer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对题目库中的题目做本地评分")
+    parser.add_argument("--exam-type")
+    parser.add_argument("--question-type")
+    parser.add_argument("--limit", type=int, default=1000000)
+    args = parser.parse_args()
+
+    from luminlex.question_store import question_store
+    questions = question_store.find(exam_type=args.exam_type, question_type=args.question_type, limit=args.limit)
+    scorer = get_scorer()
+
+    start = time.perf_counter()
+    scores = scorer.score_many(questions)
+    elapsed = time.perf_counter() - start
+    print(f"{len(questions)} 道题，评分用时 {elapsed * 1000:.1f}ms（词表 {len(scorer.vocabulary)} 词）")
+
+    by_difficulty: Dict[Difficulty, List[float]] = {}
+    issues = Counter()
+    for question, score in zip(questions, scores):
+        if score.difficulty is not None:
+            by_difficulty.setdefault(question.difficulty, []).append(score.difficulty)
+        for issue in score.issues:
+            issues[issue.split(" ")[0]] += 1
+    for difficulty in Difficulty:
+        values = by_difficulty.get(difficulty)
+        if values:
+            print(f"  {difficulty.value}: {len(values)} 道，难度分均值 {np.mean(values):.2f}，"
+                  f"范围 {np.min(values):.2f}-{np.max(values):.2f}")
+    rejected = sum(1 for score in scores if not score.accepted)
+    print(f"未通过: {rejected} 道" + ("（" + "，".join(f"{k} {v}" for k, v in issues.most_common()) + "）" if issues else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+题目集规划
+
+生成题目集前先列出每个位置的要求（题目类型、子类型轮换、主题），按索引从题目库中查找已有的题目填充，
+只为剩下的位置调用平台；剩下的位置按相同的生成参数分组，每组用一次请求生成多道题。
+
+复用的题目必须是 AI 生成的（离线题库的降级题目不复用）、通过本地评分，且在同一套题目中不重复（按 id 和题干），
+调用方也可以排除已经做过的题目。没有指定主题时优先选择主题不同的题目；
+指定了总时长时优先选择预计完成时间接近每道题平均时长的题目；同样合适的题目中随机选择，
+重复生成同样的题目集时会轮换使用题目库中的题目。
+"""
+import random
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import msgspec
+
+from luminlex.models import Question
+from luminlex.question_store import QuestionStore, question_store
+
+# 每个 (题目类型, 子类型) 从题目库中取出的候选数（满足复用条件的题目）为所需数量的倍数
+CANDIDATE_FACTOR = 4
+
+
+class SetSlot(msgspec.Struct, kw_only=True):
+    """题目集中的一个位置"""
+    index: int
+    question_type: str
+    subtype: str
+    topic: Optional[str] = None
+    question: Optional[Question] = None
+    reused: bool = False
+
+
+class GenerationBatch(msgspec.Struct, kw_only=True):
+    """生成参数相同、用一次请求生成的一组位置"""
+    question_type: str
+    subtype: str
+    topic: Optional[str]
+    slots: List[int]
+
+
+def _text_key(question: Question) -> str:
+    """判断题目重复时使用的题干（忽略大小写和空白）"""
+    return " ".join(question.question.lower().split())
+
+
+class SetPlan:
+    """一套题目的规划：每个位置由题目库中的题目填充，或等待生成"""
+
+    def __init__(self,
+                 exam_type: str,
+                 difficulty: str,
+                 topic: Optional[str],
+                 slots: List[SetSlot],
+                 target_time: Optional[float] = None):
+        self.exam_type = exam_type
+        self.difficulty = difficulty
+        self.topic = topic
+        self.slots = slots
+        self.target_time = target_time
+
+    @property
+    def reused_count(self) -> int:
+        return sum(1 for slot in self.slots if slot.reused)
+
+    @property
+    def pending(self) -> List[SetSlot]:
+        return [slot for slot in self.slots if slot.question is None]
+
+    def slot_time(self) -> Optional[float]:
+        """待生成的位置平均每道题的预计完成时间（指定了总时长时）"""
+        pending = self.pending
+        if self.target_time is None or not pending:
+            return None
+        used = sum(slot.question.estimated_time for slot in self.slots if slot.question is not None)
+        return max(1.0, (self.target_time - used) / len(pending))
+
+    def batches(self, size: int) -> List[GenerationBatch]:
+        """把待生成的位置按生成参数分组，每组最多 size 道"""
+        groups: Dict[Tuple, List[int]] = {}
+        for slot in self.pending:
+            groups.setdefault((slot.question_type, slot.subtype, slot.topic), []).append(slot.index)
+        batches = []
+        for (question_type, subtype, topic), indexes in groups.items():
+            for start in range(0, len(indexes), max(1, size)):
+                batches.append(GenerationBatch(
+                    question_type=question_type,
+                    subtype=subtype,
+                    topic=topic,
+                    slots=indexes[start:start + size]
+                ))
+        return batches
+
+    def fill(self, batch: GenerationBatch, questions: List[Question]):
+        """把生成的题目依次放入该组的位置"""
+        for index, question in zip(batch.slots, questions):
+            self.slots[index].question = question
+
+    def questions(self) -> List[Question]:
+        """已填充的题目（按位置顺序）"""
+        return [slot.question for slot in self.slots if slot.question is not None]
+
+
+def plan_question_set(exam_type: str,
+                      difficulty: str,
+                      items: List[Dict[str, str]],
+                      topic: Optional[str] = None,
+                      target_time: Optional[float] = None,
+                      exclude_ids: Iterable[str] = (),
+                      reuse: bool = True,
+                      store: Optional[QuestionStore] = None,
+                      rng: Optional[random.Random] = None) -> SetPlan:
+    """列出题目集的每个位置，并尽量用题目库中已有的题目填充（rng 用于在同样合适的题目中随机选择）"""
+    slots = [
+        SetSlot(index=i, question_type=item["question_type"], subtype=item["subtype"], topic=topic)
+        for i, item in enumerate(items)
+    ]
+    plan = SetPlan(exam_type, difficulty, topic, slots, target_time)
+    if reuse and slots:
+        _fill_from_store(plan, set(exclude_ids), store or question_store, rng or random.Random())
+    return plan
+
+
+def _fill_from_store(plan: SetPlan, exclude_ids: set, store: QuestionStore, rng: random.Random):
+    from luminlex.scoring import get_scorer
+
+    by_key: Dict[Tuple[str, str], List[SetSlot]] = {}
+    for slot in plan.slots:
+        by_key.setdefault((slot.question_type, slot.subtype), []).append(slot)
+
+    # 每种 (题目类型, 子类型) 按索引取出满足复用条件的候选（离线题库的题目、排除的题目和其他主题的题目
+    # 在索引记录中筛掉，不占候选数），合并后一次完成本地评分
+    candidates: List[Question] = []
+    for (question_type, subtype), key_slots in by_key.items():
+        candidates.extend(store.find(
+            exam_type=plan.exam_type,
+            question_type=question_type,
+            subtype=subtype,
+            difficulty=plan.difficulty,
+            limit=len(key_slots) * CANDIDATE_FACTOR,
+            topic=plan.topic,
+            generated_by_ai=True,
+            exclude_ids=exclude_ids
+        ))
+    if not candidates:
+        return
+    scores = get_scorer().score_many(candidates)
+
+    pools: Dict[Tuple[str, str], List[Question]] = {}
+    for question, score in zip(candidates, scores):
+        if score.accepted:
+            pools.setdefault((question.question_type.value, question.subtype), []).append(question)
+
+    used_texts = set()
+    used_topics = set()
+    average_time = plan.target_time / len(plan.slots) if plan.target_time else None
+    for key, key_slots in by_key.items():
+        pool = pools.get(key, [])
+        for slot in key_slots:
+            best = None
+            best_rank = None
+            for question in pool:
+                if _text_key(question) in used_texts:
+                    continue
+                # 主题尚未出现的优先，其次是预计完成时间接近平均时长的，同样合适的随机选择
+                rank = (
+                    question.topic in used_topics if plan.topic is None else False,
+                    abs(question.estimated_time - average_time) if average_time else 0,
+                    rng.random()
+                )
+                if best_rank is None or rank < best_rank:
+                    best, best_rank = question, rank
+            if best is None:
+                break
+            pool.remove(best)
+            used_texts.add(_text_key(best))
+            used_topics.add(best.topic)
+            slot.question = best
+            slot.reused = True
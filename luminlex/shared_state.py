@@ -0,0 +1,419 @@
+"""
+多副本共享状态
+
+多个 Streamlit / HTTP 服务副本通过同一个后端共享平台探测结果、响应缓存、题目库和限流令牌桶，
+避免每个副本各自探测平台、各自占用一份平台限额。后端由配置项 state_url 指定：
+
+- sqlite:///data/shared_state.sqlite3（默认，位于数据目录；同一主机上的容器挂载同一个卷即可共享）
+- redis://host:6379/0（需要安装 redis 包，也可使用 Valkey 等兼容服务）
+- memory://（仅进程内，不跨副本共享）
+
+后端只保存字节串，序列化由调用方负责。
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from luminlex import config
+
+# 令牌桶状态在空闲多久后可以丢弃（秒，额外加上桶回满所需时间）
+_BUCKET_IDLE_SECONDS = 60
+
+
+class SharedState:
+    """共享状态后端基类"""
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取键值，不存在或已过期时返回 None"""
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        """写入键值，ttl 为过期秒数（None 表示不过期）"""
+        raise NotImplementedError
+
+    def set_if_absent(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        """键不存在（或已过期）时写入，返回是否写入成功"""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def append(self, stream: str, value: bytes) -> int:
+        """向只追加的日志写入一条记录，返回记录序号（同一日志内递增）"""
+        raise NotImplementedError
+
+    def read_since(self, stream: str, after: int = 0, limit: Optional[int] = None) -> List[Tuple[int, bytes]]:
+        """读取序号大于 after 的日志记录（最多 limit 条），按序号排列"""
+        raise NotImplementedError
+
+    def trim(self, stream: str, keep: int) -> List[bytes]:
+        """只保留日志中最新的 keep 条记录，返回删除的记录（按序号排列）；之后写入的记录序号照常递增"""
+        raise NotImplementedError
+
+    def acquire_token(self, bucket: str, capacity: float, rate: float, reserve: float = 0.0) -> float:
+        """
+        从令牌桶取一个令牌（capacity 为桶容量，rate 为每秒补充的令牌数）。
+        reserve 为保留给其他请求的令牌数，桶中令牌不超过该数量时不取。
+        取到时返回 0，否则返回大约还需等待的秒数。
+        """
+        raise NotImplementedError
+
+
+def _refill(tokens: float, updated: float, now: float, capacity: float, rate: float,
+            reserve: float = 0.0) -> Tuple[float, float]:
+    """按时间补充令牌并尝试取一个，返回 (剩余令牌, 需等待秒数)"""
+    tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1 + reserve:
+        return tokens - 1, 0.0
+    return tokens, (1 + reserve - tokens) / rate
+
+
+class MemoryState(SharedState):
+    """进程内状态（不跨副本共享，适合单副本或测试）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._streams: Dict[str, List[bytes]] = {}
+        # 各日志已删除的记录数（第一条保留记录的序号为该数加 1）
+        self._trimmed: Dict[str, int] = {}
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def _live(self, key: str) -> Optional[bytes]:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= time.time():
+            del self._values[key]
+            return None
+        return value
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._live(key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        with self._lock:
+            self._values[key] = (value, time.time() + ttl if ttl else None)
+
+    def set_if_absent(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self._values[key] = (value, time.time() + ttl if ttl else None)
+            return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def append(self, stream: str, value: bytes) -> int:
+        with self._lock:
+            records = self._streams.setdefault(stream, [])
+            records.append(value)
+            return self._trimmed.get(stream, 0) + len(records)
+
+    def read_since(self, stream: str, after: int = 0, limit: Optional[int] = None) -> List[Tuple[int, bytes]]:
+        with self._lock:
+            records = self._streams.get(stream, [])
+            trimmed = self._trimmed.get(stream, 0)
+            start = max(after - trimmed, 0)
+            end = len(records) if limit is None else min(len(records), start + limit)
+            return [(trimmed + i + 1, records[i]) for i in range(start, end)]
+
+    def trim(self, stream: str, keep: int) -> List[bytes]:
+        with self._lock:
+            records = self._streams.get(stream, [])
+            count = max(len(records) - keep, 0)
+            removed = records[:count]
+            del records[:count]
+            self._trimmed[stream] = self._trimmed.get(stream, 0) + count
+            return removed
+
+    def acquire_token(self, bucket: str, capacity: float, rate: float, reserve: float = 0.0) -> float:
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(bucket, (capacity, now))
+            tokens, wait = _refill(tokens, updated, now, capacity, rate, reserve)
+            self._buckets[bucket] = (tokens, now)
+            return wait
+
+
+class SQLiteState(SharedState):
+    """
+    SQLite 文件（WAL 模式）。多个进程、多个容器可以共用同一个文件，
+    但文件必须在本机磁盘上：WAL 依赖共享内存，不能放在 NFS 等网络文件系统上。
+    过期的键值在读取时忽略，写入时每隔 PURGE_INTERVAL 秒删除一次。
+    """
+
+    PURGE_INTERVAL = 60.0
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS kv (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            expires REAL
+        );
+        CREATE INDEX IF NOT EXISTS kv_expires ON kv (expires) WHERE expires IS NOT NULL;
+        CREATE TABLE IF NOT EXISTS log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            stream TEXT NOT NULL,
+            value BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS log_stream_seq ON log (stream, seq);
+        CREATE TABLE IF NOT EXISTS buckets (
+            name TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # sqlite3 连接不能跨线程使用，每个线程一个连接
+        self._local = threading.local()
+        self._purged_at = 0.0
+        self._purge_lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            import sqlite3
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self._SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        now = time.time()
+        self._purge_expired(now)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+            (key, value, now + ttl if ttl else None)
+        )
+
+    def set_if_absent(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        now = time.time()
+        self._purge_expired(now)
+        cursor = self._conn().execute(
+            "INSERT INTO kv (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires "
+            "WHERE kv.expires IS NOT NULL AND kv.expires <= ?",
+            (key, value, now + ttl if ttl else None, now)
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def _purge_expired(self, now: float):
+        """删除过期的键值（每个进程每隔 PURGE_INTERVAL 秒最多执行一次）"""
+        with self._purge_lock:
+            if now - self._purged_at < self.PURGE_INTERVAL:
+                return
+            self._purged_at = now
+        self._conn().execute("DELETE FROM kv WHERE expires IS NOT NULL AND expires <= ?", (now,))
+
+    def append(self, stream: str, value: bytes) -> int:
+        cursor = self._conn().execute("INSERT INTO log (stream, value) VALUES (?, ?)", (stream, value))
+        return cursor.lastrowid
+
+    def read_since(self, stream: str, after: int = 0, limit: Optional[int] = None) -> List[Tuple[int, bytes]]:
+        # LIMIT -1 表示不限制条数
+        return self._conn().execute(
+            "SELECT seq, value FROM log WHERE stream = ? AND seq > ? ORDER BY seq LIMIT ?",
+            (stream, after, -1 if limit is None else limit)
+        ).fetchall()
+
+    def trim(self, stream: str, keep: int) -> List[bytes]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT seq, value FROM log WHERE stream = ? ORDER BY seq DESC LIMIT -1 OFFSET ?",
+                (stream, keep)
+            ).fetchall()
+            if rows:
+                conn.execute("DELETE FROM log WHERE stream = ? AND seq <= ?", (stream, rows[0][0]))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return [value for _, value in reversed(rows)]
+
+    def acquire_token(self, bucket: str, capacity: float, rate: float, reserve: float = 0.0) -> float:
+        conn = self._conn()
+        # IMMEDIATE 事务先取得写锁，保证多个进程的读-改-写不会交错
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (bucket,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens, wait = _refill(tokens, updated, now, capacity, rate, reserve)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                (bucket, tokens, now)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+
+class RedisState(SharedState):
+    """Redis 或兼容服务（Valkey、KeyDB 等），调用时才导入 redis 包"""
+
+    # 令牌桶在服务端原子更新，时间取服务端时钟，避免各副本时钟不一致
+    _ACQUIRE_SCRIPT = """
+        local capacity = tonumber(ARGV[1])
+        local rate = tonumber(ARGV[2])
+        local reserve = tonumber(ARGV[4])
+        local time = redis.call('TIME')
+        local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+        local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+        local tokens = tonumber(state[1]) or capacity
+        local updated = tonumber(state[2]) or now
+        tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+        local wait = 0
+        if tokens >= 1 + reserve then
+            tokens = tokens - 1
+        else
+            wait = (1 + reserve - tokens) / rate
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+        redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+        return tostring(wait)
+    """
+
+    # 日志保存在列表中，log_trimmed:<日志> 为已删除的记录数，记录序号为该数加上在列表中的位置
+    _APPEND_SCRIPT = """
+        local length = redis.call('RPUSH', KEYS[1], ARGV[1])
+        return length + tonumber(redis.call('GET', KEYS[2]) or '0')
+    """
+
+    _READ_SCRIPT = """
+        local trimmed = tonumber(redis.call('GET', KEYS[2]) or '0')
+        local start = math.max(tonumber(ARGV[1]) - trimmed, 0)
+        local limit = tonumber(ARGV[2])
+        local stop = -1
+        if limit >= 0 then
+            stop = start + limit - 1
+        end
+        return {trimmed + start, redis.call('LRANGE', KEYS[1], start, stop)}
+    """
+
+    _TRIM_SCRIPT = """
+        local count = redis.call('LLEN', KEYS[1]) - tonumber(ARGV[1])
+        if count <= 0 then
+            return {}
+        end
+        local removed = redis.call('LRANGE', KEYS[1], 0, count - 1)
+        redis.call('LTRIM', KEYS[1], count, -1)
+        redis.call('INCRBY', KEYS[2], count)
+        return removed
+    """
+
+    def __init__(self, url: str, prefix: str = "luminlex:"):
+        self.url = url
+        self.prefix = prefix
+        self._client = None
+        self._acquire = None
+        self._append = None
+        self._read = None
+        self._trim = None
+        self._lock = threading.Lock()
+
+    def _redis(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    try:
+                        import redis
+                    except ImportError:
+                        raise RuntimeError("使用 Redis 共享状态需要安装 redis 包：pip install redis")
+                    client = redis.Redis.from_url(self.url)
+                    self._acquire = client.register_script(self._ACQUIRE_SCRIPT)
+                    self._append = client.register_script(self._APPEND_SCRIPT)
+                    self._read = client.register_script(self._READ_SCRIPT)
+                    self._trim = client.register_script(self._TRIM_SCRIPT)
+                    self._client = client
+        return self._client
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._redis().get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        self._redis().set(self.prefix + key, value, px=int(ttl * 1000) if ttl else None)
+
+    def set_if_absent(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        return bool(self._redis().set(self.prefix + key, value, px=int(ttl * 1000) if ttl else None, nx=True))
+
+    def delete(self, key: str):
+        self._redis().delete(self.prefix + key)
+
+    def _log_keys(self, stream: str) -> List[str]:
+        return [self.prefix + "log:" + stream, self.prefix + "log_trimmed:" + stream]
+
+    def append(self, stream: str, value: bytes) -> int:
+        self._redis()
+        return int(self._append(keys=self._log_keys(stream), args=[value]))
+
+    def read_since(self, stream: str, after: int = 0, limit: Optional[int] = None) -> List[Tuple[int, bytes]]:
+        self._redis()
+        first, values = self._read(keys=self._log_keys(stream), args=[after, -1 if limit is None else limit])
+        return list(enumerate(values, start=int(first) + 1))
+
+    def trim(self, stream: str, keep: int) -> List[bytes]:
+        self._redis()
+        return list(self._trim(keys=self._log_keys(stream), args=[keep]))
+
+    def acquire_token(self, bucket: str, capacity: float, rate: float, reserve: float = 0.0) -> float:
+        self._redis()
+        idle = int(capacity / rate) + _BUCKET_IDLE_SECONDS
+        return float(self._acquire(keys=[self.prefix + "bucket:" + bucket], args=[capacity, rate, idle, reserve]))
+
+
+def from_url(url: str) -> SharedState:
+    """按 URL 创建共享状态后端"""
+    if url.startswith("sqlite:///"):
+        return SQLiteState(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisState(url)
+    if url == "memory://":
+        return MemoryState()
+    raise ValueError(f"不支持的共享状态地址: {url}")
+
+
+_instance: Optional[SharedState] = None
+_instance_lock = threading.Lock()
+
+
+def get_shared_state() -> SharedState:
+    """获取共享状态后端（第一次调用时按配置创建）"""
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                default_url = "sqlite:///" + os.path.join(config.DATA_DIR, "shared_state.sqlite3")
+                _instance = from_url(config.get("state_url", default_url))
+    return _instance
+
+
+def set_shared_state(state: SharedState):
+    """替换共享状态后端（用于测试和脚本）"""
+    global _instance
+    with _instance_lock:
+        _instance = state
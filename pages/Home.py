@@ -1,323 +1,364 @@
 import streamlit as st
-import json
-import random
+import threading
+import uuid
+from collections import OrderedDict
 from datetime import datetime
-import question_generator
+import msgspec
+from luminlex.question_generator import get_question_generator
+from luminlex.prefetch import prefetcher
+from luminlex.offline_engine import get_offline_engine
+
+# 考试类型映射
+exam_type_mapping = {
+    "CET-4": "cet4",
+    "CET-6": "cet6",
+    "TEM-4": "tem4",
+    "TEM-8": "tem8",
+    "IELTS": "ielts",
+    "TOEFL": "toefl"
+}
+
+# 题目类型映射
+question_type_mapping = {
+    "听力": "listening",
+    "阅读": "reading",
+    "写作": "writing",
+    "翻译": "translation"
+}
+
+# 难度映射
+difficulty_mapping = {
+    "简单": "easy",
+    "中等": "medium",
+    "困难": "hard"
+}
+
+# 显示名称（由内部取值反查）
+exam_type_labels = {v: k for k, v in exam_type_mapping.items()}
+question_type_labels = {v: k for k, v in question_type_mapping.items()}
+difficulty_labels = {v: k for k, v in difficulty_mapping.items()}
+
+INTRO_HTML = """
+<div style='background-color: rgba(255, 214, 102, 0.1); padding: 1rem; border-radius: 12px; border-left: 4px solid #FFD166; margin-bottom: 1.5rem;'>
+<p style='color: #5D4037; line-height: 1.5; margin: 0;'>
+    一个简单的英语题目生成工具，点击按钮即可生成四六级等英语考试题目。
+    系统会自动尝试使用AI API生成真实题目，如果AI不可用则使用模拟数据。
+</p>
+</div>
+"""
+
+FOOTER_HTML = """
+<div style='text-align: center; color: #8D6E63; font-size: 0.9rem; margin-top: 2rem; padding-top: 1rem; border-top: 1px solid #FFD166;'>
+    <p><strong>Luminlex - 简单英语题目生成器</strong></p>
+    <p>版本: v1.0 | 最后更新: 2026年1月4日</p>
+</div>
+"""
+
+# 每个会话保留的历史题目数（页面只显示最近 5 道，更早的题目仍可在题目库中按 id 查到）
+HISTORY_LIMIT = 20
+
+# 按题目 id 缓存渲染结果：题目卡片 HTML、题目信息、下载用 JSON
+_RENDER_CACHE_SIZE = 256
+_render_cache = OrderedDict()
+_render_lock = threading.Lock()
+
+
+def _rendered(question):
+    """返回题目的渲染结果，同一 id 的题目内容不变时直接复用"""
+    with _render_lock:
+        cached = _render_cache.get(question.id)
+        if cached is not None and (cached[0] is question or cached[0] == question):
+            _render_cache.move_to_end(question.id)
+            return cached[1]
+
+    generated_at = datetime.fromtimestamp(question.generated_at)
+    rendered = {
+        "card": f"""
+<div style='background-color: white; padding: 1.5rem; border-radius: 12px; border: 2px solid #FFD166; box-shadow: 0 4px 12px rgba(0, 0, 0, 0.05);'>
+    <h3 style='color: #FF6B35; margin-top: 0;'>题目内容</h3>
+    <p style='color: #5D4037; line-height: 1.6;'>{question.question}</p>
+</div>
+""",
+        "info": "  \n".join([
+            f"**考试类型**：{exam_type_labels[question.exam_type]}",
+            f"**题目类型**：{question_type_labels[question.question_type]}",
+            f"**难度**：{difficulty_labels[question.difficulty]}",
+            f"**生成时间**：{generated_at.strftime('%Y-%m-%d %H:%M:%S')}"
+        ]),
+        "json": msgspec.json.format(question.to_json(), indent=2),
+        "file_name": f"question_{generated_at.strftime('%Y%m%d_%H%M%S')}.json"
+    }
+
+    with _render_lock:
+        _render_cache[question.id] = (question, rendered)
+        if len(_render_cache) > _RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return rendered
+
 
 def main():
     """主函数"""
-    
+
     # 页面标题
     st.title("📚 Luminlex - 英语题目生成器")
-    
+
     # 简单介绍
-    st.markdown("""
-    <div style='background-color: rgba(255, 214, 102, 0.1); padding: 1rem; border-radius: 12px; border-left: 4px solid #FFD166; margin-bottom: 1.5rem;'>
-    <p style='color: #5D4037; line-height: 1.5; margin: 0;'>
-        一个简单的英语题目生成工具，点击按钮即可生成四六级等英语考试题目。
-        系统会自动尝试使用AI API生成真实题目，如果AI不可用则使用模拟数据。
-    </p>
-    </div>
-    """, unsafe_allow_html=True)
-    
+    st.markdown(INTRO_HTML, unsafe_allow_html=True)
+
     # 初始化session state
     if "current_question" not in st.session_state:
         st.session_state.current_question = None
     if "question_history" not in st.session_state:
         st.session_state.question_history = []
-    
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    if "generation_message" not in st.session_state:
+        st.session_state.generation_message = None
+
     # 显示AI平台状态
-    available_platforms = question_generator.question_generator.available_platforms
+    available_platforms = get_question_generator().available_platforms
     if available_platforms:
         platform_names = [platform["name"] for platform in available_platforms.values()]
         st.info(f"✅ 检测到可用的AI平台: {', '.join(platform_names)}")
     else:
         st.warning("⚠️ 未检测到可用的AI平台，将使用模拟数据生成题目")
-    
-    # 创建两列布局
+
+    # 创建两列布局；选项、题目展示和历史记录各自作为 fragment 独立重跑
     col1, col2 = st.columns([1, 1])
-    
+
     with col1:
-        # 题目生成选项
-        st.subheader("🎯 生成选项")
-        
-        # 考试类型映射
-        exam_type_mapping = {
-            "CET-4": "cet4",
-            "CET-6": "cet6", 
-            "TEM-4": "tem4",
-            "TEM-8": "tem8",
-            "IELTS": "ielts",
-            "TOEFL": "toefl"
-        }
-        
-        # 题目类型映射
-        question_type_mapping = {
-            "听力": "listening",
-            "阅读": "reading",
-            "写作": "writing",
-            "翻译": "translation"
-        }
-        
-        # 难度映射
-        difficulty_mapping = {
-            "简单": "easy",
-            "中等": "medium",
-            "困难": "hard"
-        }
-        
-        # 考试类型
-        exam_type_display = st.selectbox(
-            "选择考试类型",
-            options=["CET-4", "CET-6", "TEM-4", "TEM-8", "IELTS", "TOEFL"],
-            index=0,
-            help="选择要生成的考试类型"
-        )
-        exam_type = exam_type_mapping[exam_type_display]
-        
-        # 题目类型
-        question_type_display = st.selectbox(
-            "选择题目类型",
-            options=["听力", "阅读", "写作", "翻译"],
-            index=1,
-            help="选择题目类型"
-        )
-        question_type = question_type_mapping[question_type_display]
-        
-        # 获取子类型
-        subtypes = question_generator.question_generator.question_types.get(question_type, {}).get("subtypes", [""])
-        subtype = st.selectbox(
-            "选择子类型",
-            options=subtypes,
-            index=0,
-            help="选择题目子类型"
-        )
-        
-        # 难度
-        difficulty_display = st.selectbox(
-            "选择难度",
-            options=["简单", "中等", "困难"],
-            index=1,
-            help="选择题目难度"
-        )
-        difficulty = difficulty_mapping[difficulty_display]
-        
-        # 主题（可选）
-        topic = st.text_input(
-            "主题（可选）",
-            placeholder="例如：环境保护、科技、教育等",
-            help="指定题目主题，留空则随机生成"
-        )
-        
-        # 生成按钮
-        generate_btn = st.button(
-            "✨ 生成题目",
-            type="primary",
-            use_container_width=True
-        )
-    
+        options_panel()
+
     with col2:
-        # 题目展示区域
-        st.subheader("📝 生成的题目")
-        
-        if generate_btn:
-            with st.spinner("正在生成题目..."):
-                try:
-                    # 使用question_generator生成题目
-                    question = question_generator.question_generator.generate_question(
-                        exam_type=exam_type,
-                        question_type=question_type,
-                        subtype=subtype,
-                        difficulty=difficulty,
-                        topic=topic if topic else None
-                    )
-                    
-                    # 添加显示用的字段
-                    question["exam_type_display"] = exam_type_display
-                    question["question_type_display"] = question_type_display
-                    question["difficulty_display"] = difficulty_display
-                    
-                    # 保存到session state
-                    st.session_state.current_question = question
-                    st.session_state.question_history.append({
-                        "timestamp": datetime.now().strftime("%H:%M:%S"),
-                        "exam_type": exam_type_display,
-                        "question_type": question_type_display,
-                        "question": question
-                    })
-                    
-                    # 显示生成方式
-                    if question.get("generated_by_ai", True):
-                        st.success("✅ 题目生成成功！(使用AI生成)")
-                    else:
-                        st.success("✅ 题目生成成功！(使用模拟数据)")
-                        
-                except Exception as e:
-                    st.error(f"生成题目时出错: {str(e)}")
-                    # 如果出错，使用模拟数据
-                    question = generate_mock_question(exam_type_display, question_type_display, difficulty_display, topic)
-                    st.session_state.current_question = question
-                    st.session_state.question_history.append({
-                        "timestamp": datetime.now().strftime("%H:%M:%S"),
-                        "exam_type": exam_type_display,
-                        "question_type": question_type_display,
-                        "question": question
-                    })
-                    st.success("✅ 题目生成成功！(使用模拟数据)")
-        
-        # 显示当前题目
-        if st.session_state.current_question:
-            question = st.session_state.current_question
-            
-            # 题目卡片
-            st.markdown(f"""
-            <div style='background-color: white; padding: 1.5rem; border-radius: 12px; border: 2px solid #FFD166; box-shadow: 0 4px 12px rgba(0, 0, 0, 0.05);'>
-                <h3 style='color: #FF6B35; margin-top: 0;'>题目内容</h3>
-                <p style='color: #5D4037; line-height: 1.6;'>{question['content']}</p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # 如果有选项，显示选项
-            if question.get('options'):
-                st.markdown("**选项：**")
-                for option in question['options']:
-                    st.markdown(f"- {option}")
-            
-            # 答案和解析
-            col_a, col_b = st.columns(2)
-            
-            with col_a:
-                with st.expander("查看答案", expanded=False):
-                    st.markdown(f"**正确答案：**\n\n{question['answer']}")
-            
-            with col_b:
-                with st.expander("查看解析", expanded=False):
-                    st.markdown(f"**解析：**\n\n{question['explanation']}")
-            
-            # 题目信息
-            st.markdown(f"""
-            **考试类型**：{question['exam_type']}  
-            **题目类型**：{question['question_type']}  
-            **难度**：{question['difficulty']}  
-            **生成时间**：{question['generated_at']}
-            """)
-            
-            # 操作按钮
-            st.divider()
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                if st.button("🔄 重新生成", use_container_width=True):
-                    st.session_state.current_question = None
-                    st.rerun()
-            
-            with col2:
-                # 下载JSON
-                json_data = json.dumps(question, ensure_ascii=False, indent=2)
-                st.download_button(
-                    label="📥 下载题目",
-                    data=json_data,
-                    file_name=f"question_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json",
-                    use_container_width=True
-                )
-        else:
-            st.info("👈 请在左侧选择选项并点击'生成题目'按钮")
-    
-    # 历史记录
-    if st.session_state.question_history:
-        st.divider()
-        st.subheader("📜 生成历史")
-        
-        # 只显示最近5条记录
-        for i, record in enumerate(st.session_state.question_history[-5:]):
-            with st.expander(f"{record['timestamp']} - {record['exam_type']} {record['question_type']}", expanded=False):
-                st.markdown(f"**考试类型**：{record['exam_type']}")
-                st.markdown(f"**题目类型**：{record['question_type']}")
-                st.markdown(f"**题目内容**：{record['question']['content'][:100]}...")
-                
-                if st.button(f"重新加载此题", key=f"reload_{i}"):
-                    st.session_state.current_question = record['question']
-                    st.rerun()
-    
+        question_panel()
+
+    history_panel()
+
     # 页脚
     st.divider()
-    st.markdown("""
-    <div style='text-align: center; color: #8D6E63; font-size: 0.9rem; margin-top: 2rem; padding-top: 1rem; border-top: 1px solid #FFD166;'>
-        <p><strong>Luminlex - 简单英语题目生成器</strong></p>
-        <p>版本: v1.0 | 最后更新: 2026年1月4日</p>
-    </div>
-    """, unsafe_allow_html=True)
-
-def generate_mock_question(exam_type, question_type, difficulty, topic=None):
-    """生成模拟题目"""
-    
-    # 如果没有指定主题，使用随机主题
-    if not topic:
-        topics = ["环境保护", "科技发展", "教育政策", "健康生活", "文化交流", "经济发展", "社会问题", "人工智能"]
-        topic = random.choice(topics)
-    
-    # 根据题目类型生成不同的题目
-    if question_type == "听力":
-        questions = [
-            f"听一段关于{topic}的对话，回答以下问题：对话中女士的主要观点是什么？",
-            f"听一段关于{topic}的短文，回答以下问题：文章的主要目的是什么？",
-            f"听一段关于{topic}的新闻，回答以下问题：新闻中提到的主要数据是什么？"
-        ]
-        content = random.choice(questions)
-        options = ["A. 支持该计划", "B. 反对该计划", "C. 持中立态度", "D. 未明确表态"]
-        answer = random.choice(["A", "B", "C"])
-        explanation = "根据对话/短文/新闻的内容分析，可以得出此答案。"
-    
-    elif question_type == "阅读":
-        questions = [
-            f"阅读以下关于{topic}的文章，选择最合适的标题。",
-            f"阅读以下段落，选择可以填入空白处的最佳选项。",
-            f"阅读以下文章，回答后面的问题。"
-        ]
-        content = random.choice(questions)
-        options = ["A. 新时代的挑战", "B. 当前趋势分析", "C. 历史回顾", "D. 未来展望"]
-        answer = random.choice(["A", "B", "C", "D"])
-        explanation = "根据文章内容和上下文分析，可以得出此答案。"
-    
-    elif question_type == "写作":
-        content = f"请以'{topic}'为题，写一篇议论文。\n要求：观点明确，论据充分，字数150-180词。"
-        options = None
-        answer = "这是一道写作题，需要学生自己完成作文。"
-        explanation = f"写作要点：1. 明确表达自己的观点；2. 提供2-3个支持论据；3. 适当使用连接词使文章连贯；4. 注意语法和拼写。"
-    
-    else:  # 翻译
-        if random.choice([True, False]):
-            sentences = [
-                "随着科技的快速发展，人们的生活方式发生了巨大变化。",
-                "环境保护是当今世界面临的最紧迫问题之一。",
-                "文化交流有助于增进不同国家之间的理解和友谊。"
-            ]
-            content = f"请将以下中文句子翻译成英文：\n\n{random.choice(sentences)}"
-            answer = "参考翻译：With the rapid development of technology, people's lifestyles have undergone tremendous changes."
-        else:
-            sentences = [
-                "Artificial intelligence is transforming various industries and changing the way we work.",
-                "Sustainable development requires balancing economic growth with environmental protection.",
-                "Learning a foreign language not only improves communication skills but also broadens one's horizons."
-            ]
-            content = f"请将以下英文句子翻译成中文：\n\n{random.choice(sentences)}"
-            answer = "参考翻译：人工智能正在改变各个行业，并改变我们的工作方式。"
-        
-        options = None
-        explanation = "翻译要点：注意时态一致，专业术语准确翻译，保持原文意思不变。"
-    
-    return {
-        "content": content,
-        "options": options,
-        "answer": answer,
-        "explanation": explanation,
+    st.markdown(FOOTER_HTML, unsafe_allow_html=True)
+
+
+@st.fragment
+def options_panel():
+    """生成选项（修改选项只重跑本区域）"""
+
+    # 题目生成选项
+    st.subheader("🎯 生成选项")
+
+    # 考试类型
+    exam_type_display = st.selectbox(
+        "选择考试类型",
+        options=list(exam_type_mapping),
+        index=0,
+        help="选择要生成的考试类型"
+    )
+    exam_type = exam_type_mapping[exam_type_display]
+
+    # 题目类型
+    question_type_display = st.selectbox(
+        "选择题目类型",
+        options=list(question_type_mapping),
+        index=1,
+        help="选择题目类型"
+    )
+    question_type = question_type_mapping[question_type_display]
+
+    # 获取子类型
+    subtypes = get_question_generator().question_types.get(question_type, {}).get("subtypes", [""])
+    subtype = st.selectbox(
+        "选择子类型",
+        options=subtypes,
+        index=0,
+        help="选择题目子类型"
+    )
+
+    # 难度
+    difficulty_display = st.selectbox(
+        "选择难度",
+        options=list(difficulty_mapping),
+        index=1,
+        help="选择题目难度"
+    )
+    difficulty = difficulty_mapping[difficulty_display]
+
+    # 主题（可选）
+    topic = st.text_input(
+        "主题（可选）",
+        placeholder="例如：环境保护、科技、教育等",
+        help="指定题目主题，留空则随机生成"
+    )
+
+    # 选项稳定后在后台预取该组合的题目
+    generation_params = {
         "exam_type": exam_type,
         "question_type": question_type,
+        "subtype": subtype,
         "difficulty": difficulty,
-        "topic": topic,
-        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        "topic": topic if topic else None,
+        "session_id": st.session_state.session_id
     }
+    prefetcher.observe(st.session_state.session_id, generation_params)
+
+    # 生成按钮
+    if st.button("✨ 生成题目", type="primary", use_container_width=True):
+        with st.spinner("正在生成题目..."):
+            _generate(generation_params)
+        # 题目展示和历史记录需要更新
+        st.rerun()
+
+
+def _generate(generation_params):
+    """生成题目并保存到 session state"""
+    try:
+        # 优先使用预取的题目，没有时再实时生成
+        question = prefetcher.take(st.session_state.session_id, generation_params)
+        if question is None:
+            with prefetcher.real_request():
+                question = get_question_generator().generate_question(**generation_params)
+
+        # "重新生成"通常使用相同选项，提前准备一道
+        prefetcher.refill(st.session_state.session_id, generation_params)
+
+        # 显示生成方式
+        if question.generated_by_ai:
+            st.session_state.generation_message = ("success", "✅ 题目生成成功！(使用AI生成)")
+        else:
+            st.session_state.generation_message = ("success", "✅ 题目生成成功！(使用模拟数据)")
+
+    except Exception as e:
+        # 如果出错，使用模拟数据
+        question = get_offline_engine().generate(**generation_params)
+        st.session_state.generation_message = ("error", f"生成题目时出错: {str(e)}，已使用模拟数据")
+
+    # 保存到session state
+    st.session_state.current_question = question
+    history = st.session_state.question_history
+    history.append(question)
+    del history[:-HISTORY_LIMIT]
+
+
+@st.fragment
+def question_panel():
+    """题目展示（本区域的按钮只重跑本区域）"""
+
+    # 题目展示区域
+    st.subheader("📝 生成的题目")
+
+    if st.session_state.generation_message:
+        level, message = st.session_state.generation_message
+        st.session_state.generation_message = None
+        if level == "success":
+            st.success(message)
+        else:
+            st.error(message)
+
+    # 显示当前题目
+    if not st.session_state.current_question:
+        st.info("👈 请在左侧选择选项并点击'生成题目'按钮")
+        return
+
+    question = st.session_state.current_question
+    rendered = _rendered(question)
+
+    # 题目卡片
+    st.markdown(rendered["card"], unsafe_allow_html=True)
+
+    # 如果有选项，显示选项
+    if question.options:
+        st.markdown("**选项：**")
+        for option in question.options:
+            st.markdown(f"- {option}")
+
+    # 答案和解析
+    col_a, col_b = st.columns(2)
+
+    with col_a:
+        with st.expander("查看答案", expanded=False):
+            st.markdown(f"**正确答案：**\n\n{question.answer}")
+
+    with col_b:
+        with st.expander("查看解析", expanded=False):
+            st.markdown(f"**解析：**\n\n{question.explanation}")
+
+    # 题目信息
+    st.markdown(rendered["info"])
+
+    # 操作按钮
+    st.divider()
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.button("🔄 重新生成", use_container_width=True, on_click=_clear_current_question)
+
+    with col2:
+        # 下载JSON
+        st.download_button(
+            label="📥 下载题目",
+            data=rendered["json"],
+            file_name=rendered["file_name"],
+            mime="application/json",
+            use_container_width=True
+        )
+
+    # 只重新生成部分字段，保留题目其余内容
+    col3, col4 = st.columns(2)
+
+    with col3:
+        regenerate_explanation_btn = st.button("📝 仅重新生成解析", use_container_width=True)
+
+    with col4:
+        regenerate_options_btn = st.button(
+            "🔀 仅重新生成选项",
+            use_container_width=True,
+            disabled=not question.options
+        )
+
+    if regenerate_explanation_btn or regenerate_options_btn:
+        fields = ["explanation"] if regenerate_explanation_btn else ["options", "answer", "explanation"]
+        with st.spinner("正在重新生成..."):
+            try:
+                updated = get_question_generator().regenerate_fields(question, fields)
+                st.session_state.current_question = updated
+                # 历史记录中的同一道题也需要更新
+                history = st.session_state.question_history
+                for i, record in enumerate(history):
+                    if record.id == updated.id:
+                        history[i] = updated
+                st.rerun()
+            except Exception as e:
+                st.error(f"重新生成失败: {str(e)}")
+
+
+def _clear_current_question():
+    """在本区域重跑之前清空当前题目，无需再触发一次重跑"""
+    st.session_state.current_question = None
+
+
+@st.fragment
+def history_panel():
+    """历史记录"""
+    if not st.session_state.question_history:
+        return
+
+    st.divider()
+    st.subheader("📜 生成历史")
+
+    # 只显示最近5条记录
+    for i, record in enumerate(st.session_state.question_history[-5:]):
+        timestamp = datetime.fromtimestamp(record.generated_at).strftime("%H:%M:%S")
+        record_exam_type = exam_type_labels[record.exam_type]
+        record_question_type = question_type_labels[record.question_type]
+        with st.expander(f"{timestamp} - {record_exam_type} {record_question_type}", expanded=False):
+            st.markdown(f"**考试类型**：{record_exam_type}")
+            st.markdown(f"**题目类型**：{record_question_type}")
+            st.markdown(f"**题目内容**：{record.question[:100]}...")
+
+            if st.button(f"重新加载此题", key=f"reload_{i}"):
+                st.session_state.current_question = record
+                # 题目展示区域需要更新
+                st.rerun()
+
 
 if __name__ == "__main__":
     main()
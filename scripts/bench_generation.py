@@ -0,0 +1,113 @@
+"""
+题目生成流程基准
+
+回放录制的平台请求（见 luminlex/cassette.py），测量完整生成流程（提示词、平台调用、JSON 提取与验证、
+字段补全、降级到离线题库、写入题目库）的吞吐和延迟。不访问平台、不需要密钥，结果可重复，适合在 CI 中运行。
+
+先在真实平台上录制（例如正常使用页面或运行本脚本一段时间）：
+    LUMINLEX_CASSETTE=data/cassettes/deepseek.jsonl.gz LUMINLEX_CASSETTE_MODE=record python scripts/bench_generation.py --count 200
+
+再回放：
+    LUMINLEX_CASSETTE=data/cassettes/deepseek.jsonl.gz python scripts/bench_generation.py --count 200 --concurrency 8
+    LUMINLEX_CASSETTE=... LUMINLEX_CASSETTE_TIME_SCALE=0 python scripts/bench_generation.py   # 不等待，只测本地开销
+
+吞吐低于 --min-throughput（题/秒）或 p95 延迟高于 --max-p95-ms 时以非零状态退出。
+两个阈值默认只在不等待的回放（LUMINLEX_CASSETTE_TIME_SCALE=0）中启用，此时测的是本地开销；
+其他情况下的吞吐取决于录制的平台耗时和限额，需要时显式指定阈值。
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+REQUESTS = [
+    ("cet4", "reading", "cloze", "medium"),
+    ("cet4", "writing", "argumentative", "medium"),
+    ("cet6", "reading", "multiple_choice", "hard"),
+    ("cet6", "translation", "chinese_to_english", "hard"),
+    ("ielts", "listening", "passage", "hard"),
+    ("tem4", "reading", "true_false", "easy"),
+]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="题目生成流程基准（回放录制的平台请求）")
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--min-throughput", type=float, default=None, help="最低吞吐（题/秒）")
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="p95 延迟上限（毫秒）")
+    args = parser.parse_args()
+
+    # 回放时题目写到临时目录，不影响正式的题目库
+    if os.environ.get("LUMINLEX_CASSETTE_MODE", "replay") == "replay":
+        os.environ.setdefault("LUMINLEX_DATA_DIR", tempfile.mkdtemp(prefix="luminlex-bench-"))
+        os.environ.setdefault("LUMINLEX_STATE_URL", "memory://")
+
+    from luminlex.cassette import get_cassette
+    from luminlex.question_generator import get_question_generator
+
+    cassette = get_cassette()
+    if cassette is None:
+        print("未配置 cassette（LUMINLEX_CASSETTE），将直接访问平台")
+    if cassette is not None and cassette.replaying and cassette.time_scale == 0:
+        if args.min_throughput is None:
+            args.min_throughput = float(os.environ.get("LUMINLEX_BENCH_MIN_THROUGHPUT", "50"))
+        if args.max_p95_ms is None:
+            args.max_p95_ms = float(os.environ.get("LUMINLEX_BENCH_MAX_P95_MS", "250"))
+    generator = get_question_generator()
+    print(f"可用平台: {', '.join(generator.available_platforms) or '无（全部使用离线题库）'}")
+
+    def generate(i):
+        exam_type, question_type, subtype, difficulty = REQUESTS[i % len(REQUESTS)]
+        start = time.perf_counter()
+        question = generator.generate_question(exam_type, question_type, subtype, difficulty)
+        return time.perf_counter() - start, question
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(generate, range(args.count)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency * 1000 for latency, _ in results]
+    outcome = Counter()
+    for _, question in results:
+        if not question.generated_by_ai:
+            outcome["离线题库"] += 1
+        elif question.repaired_fields:
+            outcome["AI（补全字段）"] += 1
+        else:
+            outcome["AI"] += 1
+
+    throughput = args.count / elapsed
+    p95 = percentile(latencies, 0.95)
+    print(f"{args.count} 道题，并发 {args.concurrency}，用时 {elapsed:.2f}s，吞吐 {throughput:.1f} 题/秒")
+    print(f"延迟 p50 {percentile(latencies, 0.5):.1f}ms，p95 {p95:.1f}ms，"
+          f"p99 {percentile(latencies, 0.99):.1f}ms，均值 {statistics.mean(latencies):.1f}ms")
+    print("来源: " + "，".join(f"{name} {count}" for name, count in outcome.most_common()))
+    if cassette is not None and cassette.replaying:
+        print(f"回放匹配: 完全相同的请求 {cassette.stats['exact']} 次，按顺序替代 {cassette.stats['fallback']} 次")
+
+    failures = []
+    if args.min_throughput is not None and throughput < args.min_throughput:
+        failures.append(f"吞吐 {throughput:.1f} 题/秒 低于 {args.min_throughput:g} 题/秒")
+    if args.max_p95_ms is not None and p95 > args.max_p95_ms:
+        failures.append(f"p95 延迟 {p95:.1f}ms 超过 {args.max_p95_ms:g}ms")
+    for failure in failures:
+        print(f"失败: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
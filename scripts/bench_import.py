@@ -0,0 +1,83 @@
+"""
+导入耗时基准
+
+在全新的解释器中多次导入核心包，检查冷启动耗时是否超出预算，
+并确认导入时没有加载 Streamlit、openai 等重依赖（本地评分用到的 numpy 在第一次评分时才导入）、没有创建单例。
+
+用法：
+    python scripts/bench_import.py [--runs 10] [--budget-ms 150]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 工作进程、测试和命令行工具会导入的模块
+MODULES = [
+    "luminlex.question_generator",
+    "luminlex.question_store",
+    "luminlex.offline_engine",
+    "luminlex.prefetch",
+    "luminlex.shared_state",
+    "luminlex.cassette",
+]
+
+# 导入这些模块时不应被加载的重依赖
+FORBIDDEN = ["streamlit", "openai", "redis", "numpy"]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - start
+import luminlex.question_generator as qg, luminlex.offline_engine as oe, luminlex.shared_state as ss
+print(json.dumps({{
+    "elapsed_ms": elapsed * 1000,
+    "loaded": [m for m in {forbidden!r} if m in sys.modules],
+    "singletons": [name for name, mod in (("question_generator", qg), ("offline_engine", oe), ("shared_state", ss)) if mod._instance is not None]
+}}))
+"""
+
+
+def measure_once() -> dict:
+    code = _PROBE.format(imports="\n".join(f"import {m}" for m in MODULES), forbidden=FORBIDDEN)
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="核心包导入耗时基准")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("LUMINLEX_IMPORT_BUDGET_MS", "150")))
+    args = parser.parse_args()
+
+    results = [measure_once() for _ in range(args.runs)]
+    timings = sorted(r["elapsed_ms"] for r in results)
+    median = statistics.median(timings)
+    print(f"导入 {', '.join(MODULES)}")
+    print(f"中位数 {median:.1f}ms，最小 {timings[0]:.1f}ms，最大 {timings[-1]:.1f}ms（{args.runs} 次）")
+
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f"导入耗时中位数 {median:.1f}ms 超出预算 {args.budget_ms:.0f}ms")
+    loaded = sorted({m for r in results for m in r["loaded"]})
+    if loaded:
+        failures.append(f"导入时加载了重依赖: {', '.join(loaded)}")
+    singletons = sorted({s for r in results for s in r["singletons"]})
+    if singletons:
+        failures.append(f"导入时创建了单例: {', '.join(singletons)}")
+
+    for failure in failures:
+        print(f"失败: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+页面重跑耗时与传输量基准
+
+用 Streamlit 的 AppTest 驱动 streamlit_app.py，模拟一组常见操作，记录每次交互的耗时和
+发送给浏览器的消息字节数。每个操作测两次：
+- 整页：按整页重跑处理交互（没有 fragment 时的行为）
+- fragment：和浏览器一样，只重跑被操作控件所在的 fragment（控件不在 fragment 中时等同整页）
+
+用法：
+    python scripts/bench_rerun.py [--rounds 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import local_script_runner
+from streamlit.runtime.scriptrunner_utils.script_requests import RerunData
+
+APP_PATH = os.path.join(ROOT, "streamlit_app.py")
+
+# 每次运行中新发送的消息
+_sent = []
+# 下一次运行只重跑的 fragment
+_target_fragment = []
+
+
+def _rerun_data(**kwargs):
+    if _target_fragment:
+        kwargs["fragment_id_queue"] = list(_target_fragment)
+    return RerunData(**kwargs)
+
+
+def _record(self, msg):
+    _sent.append(msg)
+    return _original_enqueue(self, msg)
+
+
+local_script_runner.RerunData = _rerun_data
+_original_enqueue = local_script_runner.ForwardMsgQueue.enqueue
+local_script_runner.ForwardMsgQueue.enqueue = _record
+
+
+# 页面当前显示内容对应的消息
+_last_run_msgs = []
+
+
+def fragment_of(widget) -> str:
+    """查找控件所在的 fragment id（不在 fragment 中时为空字符串）"""
+    for msg in _last_run_msgs:
+        if not msg.HasField("delta") or not msg.delta.HasField("new_element"):
+            continue
+        element = msg.delta.new_element
+        kind = element.WhichOneof("type")
+        if kind and getattr(getattr(element, kind), "id", None) == widget.id:
+            return msg.delta.fragment_id
+    return ""
+
+
+def interact(at, find_widget, act, scoped: bool):
+    """执行一次交互，返回 (耗时, 发送字节数)"""
+    widget = find_widget(at)
+    fragment_id = fragment_of(widget) if scoped else ""
+    _target_fragment[:] = [fragment_id] if fragment_id else []
+    _sent.clear()
+    start = time.perf_counter()
+    try:
+        act(widget).run()
+    finally:
+        _target_fragment.clear()
+    elapsed = time.perf_counter() - start
+    sent = sum(m.ByteSize() for m in _sent if m.HasField("delta"))
+    if fragment_id:
+        # AppTest 的元素树在 fragment 重跑后不完整，不计时地整页重跑一次以便查找下一个控件
+        _sent.clear()
+        at.run()
+    _last_run_msgs[:] = list(_sent)
+    return elapsed, sent
+
+
+def button(label_prefix):
+    def find(at):
+        for b in at.button:
+            if b.label.startswith(label_prefix):
+                return b
+        raise LookupError(label_prefix)
+    return find
+
+
+def main():
+    parser = argparse.ArgumentParser(description="页面重跑耗时与传输量基准")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    difficulties = ["简单", "中等", "困难"]
+    results = {}
+    for scoped in (False, True):
+        at = AppTest.from_file(APP_PATH, default_timeout=60)
+        _sent.clear()
+        at.run()
+        _last_run_msgs[:] = list(_sent)
+
+        samples = defaultdict(list)
+        for i in range(args.rounds):
+            samples["切换难度"].append(interact(
+                at, lambda a: a.selectbox[3], lambda w: w.select(difficulties[i % 3]), scoped))
+            samples["生成题目"].append(interact(at, button("✨"), lambda w: w.click(), scoped))
+            samples["重新生成"].append(interact(at, button("🔄"), lambda w: w.click(), scoped))
+            samples["重新加载历史题目"].append(interact(at, button("重新加载"), lambda w: w.click(), scoped))
+
+        if at.exception:
+            print(f"页面出错: {at.exception}")
+            sys.exit(1)
+        results["fragment" if scoped else "整页"] = samples
+
+    print(f"{'操作':<12}{'整页 ms':>10}{'整页字节':>10}{'fragment ms':>14}{'fragment 字节':>14}")
+    for name in results["整页"]:
+        row = []
+        for mode in ("整页", "fragment"):
+            runs = results[mode][name]
+            row.append(statistics.median(t for t, _ in runs) * 1000)
+            row.append(statistics.median(b for _, b in runs))
+        print(f"{name:<14}{row[0]:>10.1f}{row[1]:>10.0f}{row[2]:>14.1f}{row[3]:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
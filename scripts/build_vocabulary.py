@@ -0,0 +1,50 @@
+"""
+生成本地评分用的分级词表
+
+把种子词表 luminlex/vocabulary.txt 与考试大纲等完整词表合并，写入数据目录的 vocabulary/
+（按字母排序的 words.npy 和对应级别的 levels.npy，评分时以内存映射方式加载）。
+额外的词表每行第一列为一个单词，用 路径:级别 指定，级别为 1 基础 / 2 四级 / 3 六级 / 4 专业与学术；
+同一单词出现在多个词表中时取最低的级别。正在运行的服务需要重启才会加载新的词表。
+
+用法：
+    python scripts/build_vocabulary.py
+    python scripts/build_vocabulary.py --extra cet4.txt:2 cet6.txt:3 tem8.txt:4
+    python scripts/build_vocabulary.py --no-seed --extra words.txt:2 --out /tmp/vocabulary
+"""
+import argparse
+import os
+import sys
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    from luminlex.scoring import SEED_PATH, VOCABULARY_DIR, Vocabulary, merge_word_lists, read_word_list, seed_digest
+
+    parser = argparse.ArgumentParser(description="生成本地评分用的分级词表")
+    parser.add_argument("--extra", nargs="*", default=[], metavar="PATH:LEVEL", help="额外的词表及其级别")
+    parser.add_argument("--no-seed", action="store_true", help="不使用种子词表")
+    parser.add_argument("--out", default=VOCABULARY_DIR, help="输出目录")
+    args = parser.parse_args()
+
+    lists = [] if args.no_seed else [read_word_list(SEED_PATH)]
+    for spec in args.extra:
+        path, _, level = spec.rpartition(":")
+        if not path or level not in ("1", "2", "3", "4"):
+            parser.error(f"词表应写成 路径:级别（级别为 1-4）: {spec}")
+        entries = read_word_list(path, level=int(level))
+        print(f"{path}: {len(entries)} 词")
+        lists.append(entries)
+    if not lists:
+        parser.error("没有可用的词表")
+
+    source = {"seed": None if args.no_seed else seed_digest(), "extra": args.extra}
+    vocabulary = Vocabulary.build(merge_word_lists(*lists), args.out, source=source)
+    levels = Counter(int(level) for level in vocabulary.levels)
+    print(f"已写入 {args.out}：{len(vocabulary)} 词（" + "，".join(f"{k} 级 {levels[k]}" for k in sorted(levels)) + "）")
+
+
+if __name__ == "__main__":
+    main()
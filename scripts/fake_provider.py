@@ -0,0 +1,292 @@
+"""
+本地模拟平台
+
+实现 OpenAI 兼容接口中 Luminlex 用到的部分，用于在没有密钥、不产生费用的情况下测试批量生成、压力测试等：
+- GET  /v1/models
+- POST /v1/chat/completions（根据提示词生成格式正确的题目 JSON，一次生成多道题时返回数组；补全字段的请求只返回所需字段）
+- POST /v1/files、GET /v1/files/{id}、GET /v1/files/{id}/content
+- POST /v1/batches、GET /v1/batches、GET /v1/batches/{id}
+
+同样的接口也挂在 /v4 下（智谱的路径）。可以按比例模拟真实平台的格式问题：
+JSON 前后带说明文字、包在代码块中、缺少字段。
+
+用法：
+    python scripts/fake_provider.py --port 8700 --latency 0.5 --batch-seconds 20
+    LUMINLEX_QWEN_API_KEY=fake LUMINLEX_QWEN_BASE_URL=http://127.0.0.1:8700/v1 python -m luminlex.batch ...
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+import uuid
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+
+MODELS = ["deepseek-chat", "deepseek-reasoner", "kimi-k2-thinking", "moonshot-v1-8k", "qwen-plus", "glm-4.7"]
+
+DIFFICULTIES = {"简单": "easy", "中等": "medium", "困难": "hard"}
+
+# 各难度的短文，词汇和句长与难度相符，能通过本地评分（luminlex/scoring.py）
+PASSAGES = {
+    "easy": "Read the passage about {topic} and choose the best answer. Many students like {topic}. "
+            "They talk about it with their friends. It changes their daily habits in ways they do not expect.",
+    "medium": "Read the following passage about {topic} and choose the best answer. "
+              "Many students believe that {topic} shapes their daily habits in unexpected ways.",
+    "hard": "Read the following passage about {topic} and choose the most appropriate answer. "
+            "Although many students acknowledge that {topic} shapes their daily habits in subtle and unexpected ways, "
+            "researchers remain divided over whether its influence is substantial or merely reflects broader social trends."
+}
+
+SUBTYPE_PATTERN = re.compile(r"题目类型：(\S+)")
+DIFFICULTY_PATTERN = re.compile(r"难度级别：(\S+)")
+TOPIC_PATTERN = re.compile(r"主题：(\S+)")
+# 一次生成多道题的请求（"请生成3道..."），返回 JSON 数组
+COUNT_PATTERN = re.compile(r"请生成(\d+)道")
+# 补全字段请求中列出的字段（"- explanation: 答案解析"）
+REPAIR_FIELD_PATTERN = re.compile(r"^- (\w+):", re.MULTILINE)
+
+
+class FakeProvider:
+    """模拟平台的状态：上传的文件、批次，以及响应的生成方式"""
+
+    def __init__(self,
+                 latency: float = 0.0,
+                 batch_seconds: float = 5.0,
+                 quirk_rate: float = 0.0,
+                 invalid_rate: float = 0.0,
+                 seed: int = 0):
+        self.latency = latency
+        self.batch_seconds = batch_seconds
+        self.quirk_rate = quirk_rate
+        self.invalid_rate = invalid_rate
+        self._random = random.Random(seed)
+        self._counter = itertools.count(1)
+        self.files = {}
+        self.batches = {}
+        self.chat_requests = 0
+
+    def question(self, prompt: str) -> dict:
+        """根据题目生成提示词构造一道题"""
+        n = next(self._counter)
+        subtype = (SUBTYPE_PATTERN.search(prompt) or [None, "reading"])[1]
+        difficulty = DIFFICULTIES.get((DIFFICULTY_PATTERN.search(prompt) or [None, "中等"])[1], "medium")
+        topic = (TOPIC_PATTERN.search(prompt) or [None, "campus life"])[1]
+        if subtype == "true_false":
+            options = ["A. True", "B. False", "C. Not Given"]
+        else:
+            options = ["A. It has no effect", "B. It shapes daily habits", "C. It is rarely discussed", "D. It only matters to teachers"]
+        return {
+            "question": f"[{subtype} #{n}] " + PASSAGES[difficulty].format(topic=topic),
+            "options": options,
+            "answer": "B",
+            "explanation": f"The passage states that {topic} shapes daily habits, so option B is correct.",
+            "difficulty": difficulty,
+            "estimated_time": self._random.choice([3, 5, 8])
+        }
+
+    def completion_text(self, messages: list) -> str:
+        prompt = messages[-1]["content"] if messages else ""
+        if "只生成以下字段" in prompt:
+            # 补全字段：只返回要求的字段
+            full = self.question(prompt)
+            fields = REPAIR_FIELD_PATTERN.findall(prompt)
+            return json.dumps({field: full.get(field, "") for field in fields}, ensure_ascii=False)
+
+        count_match = COUNT_PATTERN.search(prompt)
+        items = [self.question(prompt) for _ in range(int(count_match[1]) if count_match else 1)]
+        for data in items:
+            if self._random.random() < self.invalid_rate:
+                del data[self._random.choice(["explanation", "answer", "estimated_time"])]
+        text = json.dumps(items if count_match else items[0], ensure_ascii=False, indent=2)
+        if self._random.random() < self.quirk_rate:
+            if self._random.random() < 0.5:
+                text = f"好的，以下是根据要求生成的题目：\n\n{text}\n\n希望对你有帮助！"
+            else:
+                text = f"```json\n{text}\n```"
+        return text
+
+    def completion(self, body: dict) -> dict:
+        self.chat_requests += 1
+        text = self.completion_text(body.get("messages", []))
+        return {
+            "id": "chatcmpl-" + uuid.uuid4().hex,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", MODELS[0]),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 200, "completion_tokens": len(text) // 3, "total_tokens": 200 + len(text) // 3}
+        }
+
+    def add_file(self, content: bytes, filename: str, purpose: str) -> dict:
+        file_id = "file-" + uuid.uuid4().hex[:24]
+        info = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed"
+        }
+        self.files[file_id] = (info, content)
+        return info
+
+    def batch_view(self, batch_id: str) -> dict:
+        """按提交后经过的时间推进批次状态，到期时生成结果文件"""
+        batch = self.batches[batch_id]
+        elapsed = time.time() - batch["created_at"]
+        if batch["status"] in ("validating", "in_progress"):
+            if elapsed >= self.batch_seconds:
+                self._finish(batch)
+            elif elapsed >= self.batch_seconds * 0.1:
+                batch["status"] = "in_progress"
+                batch["in_progress_at"] = batch["in_progress_at"] or int(time.time())
+        return batch
+
+    def _finish(self, batch: dict):
+        _, content = self.files[batch["input_file_id"]]
+        outputs, errors = [], []
+        for line in content.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            result = {"id": "batch_req_" + uuid.uuid4().hex[:16], "custom_id": request.get("custom_id")}
+            if request.get("body", {}).get("model") not in MODELS:
+                result["response"] = None
+                result["error"] = {"code": "model_not_found", "message": "模型不存在"}
+                errors.append(result)
+                continue
+            result["response"] = {
+                "status_code": 200,
+                "request_id": uuid.uuid4().hex,
+                "body": self.completion(request["body"])
+            }
+            result["error"] = None
+            outputs.append(result)
+
+        def to_file(lines, name):
+            if not lines:
+                return None
+            data = "".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines).encode("utf-8")
+            return self.add_file(data, name, "batch_output")["id"]
+
+        batch["output_file_id"] = to_file(outputs, f"{batch['id']}_output.jsonl")
+        batch["error_file_id"] = to_file(errors, f"{batch['id']}_error.jsonl")
+        batch["request_counts"] = {"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)}
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+
+def create_app(provider: FakeProvider) -> Starlette:
+    async def models(request: Request):
+        return JSONResponse({
+            "object": "list",
+            "data": [{"id": m, "object": "model", "created": 0, "owned_by": "fake"} for m in MODELS]
+        })
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if body.get("model") not in MODELS:
+            return JSONResponse({"error": {"message": f"模型 {body.get('model')} 不存在"}}, status_code=404)
+        if provider.latency:
+            await asyncio.sleep(provider.latency)
+        return JSONResponse(provider.completion(body))
+
+    async def upload_file(request: Request):
+        form = await request.form()
+        upload = form["file"]
+        content = await upload.read()
+        return JSONResponse(provider.add_file(content, upload.filename or "upload.jsonl", form.get("purpose", "batch")))
+
+    async def get_file(request: Request):
+        entry = provider.files.get(request.path_params["file_id"])
+        if entry is None:
+            return JSONResponse({"error": {"message": "文件不存在"}}, status_code=404)
+        return JSONResponse(entry[0])
+
+    async def file_content(request: Request):
+        entry = provider.files.get(request.path_params["file_id"])
+        if entry is None:
+            return JSONResponse({"error": {"message": "文件不存在"}}, status_code=404)
+        return Response(entry[1], media_type="application/jsonl")
+
+    async def create_batch(request: Request):
+        body = await request.json()
+        if body.get("input_file_id") not in provider.files:
+            return JSONResponse({"error": {"message": "输入文件不存在"}}, status_code=400)
+        batch_id = "batch_" + uuid.uuid4().hex[:24]
+        provider.batches[batch_id] = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": body.get("endpoint"),
+            "input_file_id": body["input_file_id"],
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "validating",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "in_progress_at": None,
+            "completed_at": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "metadata": body.get("metadata")
+        }
+        return JSONResponse(provider.batches[batch_id])
+
+    async def list_batches(request: Request):
+        batches = sorted(provider.batches.values(), key=lambda b: b["created_at"], reverse=True)
+        return JSONResponse({"object": "list", "data": [provider.batch_view(b["id"]) for b in batches], "has_more": False})
+
+    async def get_batch(request: Request):
+        batch_id = request.path_params["batch_id"]
+        if batch_id not in provider.batches:
+            return JSONResponse({"error": {"message": "批次不存在"}}, status_code=404)
+        return JSONResponse(provider.batch_view(batch_id))
+
+    routes = [
+        Route("/models", models),
+        Route("/chat/completions", chat_completions, methods=["POST"]),
+        Route("/files", upload_file, methods=["POST"]),
+        Route("/files/{file_id}", get_file),
+        Route("/files/{file_id}/content", file_content),
+        Route("/batches", create_batch, methods=["POST"]),
+        Route("/batches", list_batches),
+        Route("/batches/{batch_id}", get_batch),
+    ]
+    # DashScope 兼容接口和智谱分别使用 /v1 和 /v4 路径；DeepSeek 同时接受不带版本号的路径
+    return Starlette(routes=[Mount("/v1", routes=routes), Mount("/v4", routes=routes), Mount("", routes=routes)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟平台（OpenAI 兼容接口）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--latency", type=float, default=0.0, help="对话接口的响应延迟（秒）")
+    parser.add_argument("--batch-seconds", type=float, default=5.0, help="批次从提交到完成的时间（秒）")
+    parser.add_argument("--quirk-rate", type=float, default=0.0, help="在 JSON 前后加说明文字或代码块的比例")
+    parser.add_argument("--invalid-rate", type=float, default=0.0, help="缺少必要字段的比例")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+    provider = FakeProvider(
+        latency=args.latency,
+        batch_seconds=args.batch_seconds,
+        quirk_rate=args.quirk_rate,
+        invalid_rate=args.invalid_rate,
+        seed=args.seed
+    )
+    uvicorn.run(create_app(provider), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+"""
+回归检查
+
+对本地模拟平台（scripts/fake_provider.py）运行核心流程中曾经出过问题的路径，任一检查失败时以非零状态退出，
+不访问真实平台、不需要密钥，适合在 CI 中运行。数据写到临时目录，共享状态使用 memory://。
+
+用法：
+    python scripts/regression_check.py
+"""
+import os
+import sys
+import tempfile
+import time
+import traceback
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+CHECKS = []
+
+
+def check(fn):
+    """登记一项检查"""
+    CHECKS.append(fn)
+    return fn
+
+
+@check
+def regenerate_explanation_with_options():
+    """只重新生成解析时保留原有选项（Question.to_dict 中的选项是元组）"""
+    from luminlex.question_generator import get_question_generator
+    generator = get_question_generator()
+    question = generator.generate_question("cet4", "reading", "multiple_choice", "medium")
+    assert question.generated_by_ai and question.options, "模拟平台未生成带选项的题目"
+    updated = generator.regenerate_fields(question, ["explanation"])
+    assert updated.id == question.id
+    assert updated.options == question.options
+    assert "explanation" in updated.repaired_fields
+
+
+@check
+def save_question_set_default_filename():
+    """不指定文件名保存题目集"""
+    from luminlex.question_generator import get_question_generator
+    generator = get_question_generator()
+    question_set = generator.new_question_set("cet4", "easy", None)
+    filename = generator.save_question_set(question_set)
+    assert os.path.exists(filename) and "cet4" in filename
+
+
+@check
+def config_keeps_falsy_values():
+    """TOML 中为 0 的配置项不会被当作未设置"""
+    from luminlex import config
+    path = os.path.join(tempfile.mkdtemp(prefix="luminlex-config-"), "secrets.toml")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("scoring_retries = 0\nresponse_cache_ttl = 0\n")
+    source = config.TomlSource(path)
+    config.add_source(source, first=False)
+    try:
+        assert config.get("scoring_retries", 1) == 0
+        assert config.get("response_cache_ttl", 60) == 0
+    finally:
+        config.set_sources([s for s in config._sources if s is not source])
+
+
+@check
+def sqlite_state_purges_expired_keys():
+    """SQLite 共享状态删除过期的键值，文件不会无限增长"""
+    from luminlex.shared_state import SQLiteState
+    state = SQLiteState(os.path.join(tempfile.mkdtemp(prefix="luminlex-state-"), "state.sqlite3"))
+    state.PURGE_INTERVAL = 0
+    for i in range(100):
+        state.set(f"response:{i}", b"x" * 100, ttl=0.01)
+    time.sleep(0.05)
+    state.set("kept", b"1")
+    rows = state._conn().execute("SELECT COUNT(*) FROM kv").fetchone()[0]
+    assert rows == 1, f"过期的键值未删除，仍有 {rows} 行"
+    assert state.get("kept") == b"1"
+
+
+@check
+def scoring_accepts_common_answer_formats():
+    """本地评分接受小写字母、带说明文字的答案（"b"、"答案：B"、"选B"、"Option B"）"""
+    from luminlex.models import Question
+    from luminlex.scoring import structural_issues
+    for answer in ["b", "答案：B", "选B", "Option B", "The correct answer is B.", "(b) the museum"]:
+        question = Question(
+            exam_type="cet4", question_type="reading", subtype="multiple_choice", difficulty="medium",
+            question="Where did they go?", answer=answer, explanation="",
+            options=("A. the park", "B. the museum", "C. a shop", "D. home")
+        )
+        issues = structural_issues(question)
+        assert not issues, f"{answer!r}: {issues}"
+
+
+@check
+def difficulty_checked_against_request():
+    """难度分按请求的难度检查，AI 把简单的题目标成"简单"时不会被重新归类后通过"""
+    from fake_provider import PASSAGES
+    from luminlex.models import Difficulty, Question
+    from luminlex.question_generator import get_question_generator
+    params = {"exam_type": "cet6", "question_type": "reading", "subtype": "multiple_choice",
+              "difficulty": "hard", "topic": "campus life"}
+    result = {
+        "question": PASSAGES["easy"].format(topic="campus life"),
+        "options": ["A. It has no effect", "B. It shapes daily habits", "C. It is rarely discussed", "D. It is new"],
+        "answer": "B", "explanation": "", "difficulty": "简单", "estimated_time": 5
+    }
+    question = Question.from_generated(result, params)
+    assert question.difficulty == Difficulty.HARD
+    issues = get_question_generator().check_question(question, result["difficulty"])
+    assert any("难度分" in issue for issue in issues), issues
+    assert any("标注的难度" in issue for issue in issues), issues
+
+
+@check
+def vocabulary_rebuilt_after_seed_change():
+    """种子词表修改后重新生成数据目录中的词表"""
+    import numpy as np
+    from luminlex import scoring
+    scoring.get_vocabulary()
+    # 模拟旧的种子词表生成的词表
+    scoring.Vocabulary.build({"zzzz": 1}, source={"seed": "outdated", "extra": []})
+    scoring._vocabulary = None
+    vocabulary = scoring.get_vocabulary()
+    assert len(vocabulary) > 1 and vocabulary.levels_of(np.array(["student"]))[0] == 1
+
+
+@check
+def set_reuse_skips_offline_and_excluded_questions():
+    """较新的离线题库题目和排除的题目不会挤掉可复用的题目，重复规划时轮换题目"""
+    from luminlex.models import Question
+    from luminlex.question_store import QuestionStore
+    from luminlex.set_planner import plan_question_set
+    from luminlex.shared_state import MemoryState
+
+    store = QuestionStore(state=MemoryState())
+    passage = ("Read the following passage about {} and choose the best answer. "
+               "Many students believe that {} shapes their daily habits in unexpected ways.")
+    topics = ["music", "travel", "sports", "science", "history", "food", "art", "health"]
+    for generated_by_ai in (True, False):
+        for topic in topics:
+            store.add(Question.from_generated(
+                {"question": passage.format(topic, topic), "answer": "B", "explanation": "",
+                 "options": ["A. yes", "B. no", "C. maybe", "D. never"], "generated_by_ai": generated_by_ai},
+                {"exam_type": "cet4", "question_type": "reading", "subtype": "multiple_choice",
+                 "difficulty": "medium", "topic": topic}
+            ))
+    items = [{"question_type": "reading", "subtype": "multiple_choice"}] * 2
+    plans = [plan_question_set("cet4", "medium", items, store=store) for _ in range(5)]
+    assert all(plan.reused_count == 2 for plan in plans), [plan.reused_count for plan in plans]
+    assert len({tuple(q.id for q in plan.questions()) for plan in plans}) > 1, "重复规划总是得到同样的题目"
+
+    excluded = [q.id for q in plans[0].questions()]
+    plan = plan_question_set("cet4", "medium", items, exclude_ids=excluded, store=store)
+    assert plan.reused_count == 2 and not set(excluded) & {q.id for q in plan.questions()}
+
+
+@check
+def offline_bank_has_materials_and_balanced_answers():
+    """离线听力、阅读题带有英文原文，选项顺序打乱后答案字母分布均匀"""
+    from collections import Counter
+    from luminlex.offline_engine import OfflineEngine
+    engine = OfflineEngine(seed=0)
+    answers = Counter()
+    for question_type, subtype in [("listening", "short_conversation"), ("listening", "news"),
+                                   ("reading", "multiple_choice"), ("reading", "cloze")]:
+        for _ in range(50):
+            question = engine.generate("cet4", question_type, subtype, "medium")
+            assert "..." not in question.question and sum(c.isascii() and c.isalpha() for c in question.question) > 100, \
+                question.question
+            answer = ord(question.answer) - ord("A")
+            assert question.options[answer].startswith(question.answer + ".")
+            answers[question.answer] += 1
+    assert max(answers.values()) < 0.4 * sum(answers.values()), answers
+
+
+@check
+def sqlite_token_bucket_shared_between_instances():
+    """两个 SQLiteState 实例（模拟两个副本）共用同一个令牌桶，合计不超过桶容量"""
+    from luminlex.shared_state import SQLiteState
+    path = os.path.join(tempfile.mkdtemp(prefix="luminlex-state-"), "state.sqlite3")
+    replicas = [SQLiteState(path), SQLiteState(path)]
+    rate = 5 / 60.0
+    granted = [replicas[i % 2].acquire_token("rpm:check", 5, rate) == 0 for i in range(8)]
+    assert granted == [True] * 5 + [False] * 3, granted
+    assert replicas[0].acquire_token("rpm:other", 5, rate) == 0, "不同的令牌桶互不影响"
+
+
+@check
+def question_store_compacts_log_and_bodies():
+    """题目库压缩后只保留最新的记录和内容，被替换过的题目保留，新副本分页加载保留的记录"""
+    from luminlex import question_store as store_module
+    from luminlex.models import Question
+    from luminlex.shared_state import SQLiteState
+
+    path = os.path.join(tempfile.mkdtemp(prefix="luminlex-state-"), "state.sqlite3")
+    store = store_module.QuestionStore(state=SQLiteState(path), max_questions=20)
+    questions = [
+        store.get(store.add(Question.from_generated(
+            {"question": f"Write about topic {i}.", "answer": "", "explanation": ""},
+            {"exam_type": "cet4", "question_type": "writing", "subtype": "letter", "difficulty": "easy"}
+        )))
+        for i in range(50)
+    ]
+    # 较早的题目在较晚时被替换，仍应保留
+    store.add(questions[0].replace(explanation="updated"))
+    assert store.compact() == 30
+    state = SQLiteState(path)
+    assert len(state.read_since(store_module.STREAM)) == 20
+    assert state.get(store_module.BODY_PREFIX + questions[1].id) is None
+    assert store.get(questions[0].id).explanation == "updated"
+
+    page, store_module.SYNC_PAGE = store_module.SYNC_PAGE, 7
+    try:
+        replica = store_module.QuestionStore(state=state, max_questions=20)
+        assert len(replica) == 20 and len(replica.find(limit=100)) == 20
+    finally:
+        store_module.SYNC_PAGE = page
+
+
+@check
+def cassette_record_then_replay():
+    """录制的平台探测和对话响应可以在不访问平台的情况下按原样回放"""
+    from luminlex import api_utils
+    from luminlex.cassette import Cassette, set_cassette
+
+    path = os.path.join(tempfile.mkdtemp(prefix="luminlex-cassette-"), "check.jsonl.gz")
+    prompts = [[{"role": "user", "content": f"请生成一道大学英语四级的阅读题目。编号 {i}"}] for i in range(3)]
+    recorder = Cassette(path, mode="record")
+    set_cassette(recorder)
+    try:
+        platforms = api_utils.probe_available_platforms()
+        recorded = [api_utils.get_chat_response("deepseek", "fake", "deepseek-chat", messages) for messages in prompts]
+        recorder.close()
+
+        # 回放时平台地址不可用，任何真实请求都会失败
+        base_url = os.environ["LUMINLEX_DEEPSEEK_BASE_URL"]
+        os.environ["LUMINLEX_DEEPSEEK_BASE_URL"] = "http://127.0.0.1:9/v1"
+        api_utils._clients.clear()
+        player = Cassette(path, mode="replay", time_scale=0)
+        set_cassette(player)
+        try:
+            replayed_platforms = api_utils.probe_available_platforms()
+            replayed = [api_utils.get_chat_response("deepseek", "replay", "deepseek-chat", messages)
+                        for messages in prompts]
+            unknown = api_utils.get_chat_response("deepseek", "replay", "deepseek-chat",
+                                                  [{"role": "user", "content": "改动过的提示词"}])
+        finally:
+            os.environ["LUMINLEX_DEEPSEEK_BASE_URL"] = base_url
+            api_utils._clients.clear()
+    finally:
+        set_cassette(None)
+
+    assert set(replayed_platforms) == set(platforms) == {"deepseek"}
+    assert replayed_platforms["deepseek"]["api_key"] == "replay"
+    assert replayed == recorded, "回放的响应与录制的不一致"
+    assert unknown == recorded[0], "没有相同请求时应按录制顺序返回同一平台的响应"
+    assert player.stats == {"exact": 3, "fallback": 1}, player.stats
+
+
+@check
+def store_filters_records_before_loading_bodies():
+    """按主题、是否由 AI 生成和排除的 id 查找时先按索引记录筛选，只读取命中的题目内容，读取时不持有锁"""
+    from luminlex.models import Question
+    from luminlex.question_store import QuestionStore
+    from luminlex.shared_state import MemoryState
+
+    class CountingState(MemoryState):
+        def get(self, key):
+            reads.append((key, replica._lock.locked()))
+            return super().get(key)
+
+    reads = []
+    state = CountingState()
+    params = {"exam_type": "cet4", "question_type": "writing", "subtype": "letter", "difficulty": "easy"}
+    writer = QuestionStore(state=state)
+    replica = QuestionStore(state=state)
+    ai_questions = []
+    for i in range(300):
+        question = Question.from_generated(
+            {"question": f"Write a letter {i}.", "answer": "", "explanation": "", "generated_by_ai": i % 100 == 0},
+            dict(params, topic="travel" if i % 2 == 0 else "music")
+        )
+        writer.add(question)
+        if question.generated_by_ai:
+            ai_questions.append(question.id)
+
+    len(replica)
+    reads.clear()
+    found = replica.find(limit=5, topic="travel", generated_by_ai=True, exclude_ids={ai_questions[-1]})
+    assert [q.id for q in found] == ai_questions[-2::-1], [q.id for q in found]
+    assert len(reads) == 2, f"读取了 {len(reads)} 道题目的内容"
+    assert not any(locked for _, locked in reads), "读取题目内容时持有锁"
+
+
+@check
+def batch_resume_does_not_resubmit():
+    """提交批次后在记录批次 id 前中断，恢复时找到已提交的批次，不重复提交"""
+    from luminlex.batch import BatchJob, plan_items
+    os.environ["LUMINLEX_QWEN_API_KEY"] = "fake"
+    os.environ["LUMINLEX_QWEN_BASE_URL"] = os.environ["LUMINLEX_DEEPSEEK_BASE_URL"]
+    root = tempfile.mkdtemp(prefix="luminlex-batch-")
+    job = BatchJob.create("qwen", plan_items("cet4", ["reading"], 2), root=root)
+    job.step()
+    assert job.manifest.chunks[0].status == "uploaded"
+
+    class Interrupted(Exception):
+        pass
+
+    batches = job.client.batches
+    create = batches.create
+
+    def create_then_crash(**kwargs):
+        create(**kwargs)
+        raise Interrupted()
+
+    batches.create = create_then_crash
+    try:
+        job.step()
+    except Interrupted:
+        pass
+    finally:
+        batches.create = create
+
+    before = len(batches.list(limit=100).data)
+    resumed = BatchJob.load(job.manifest.job_id, root=root)
+    assert resumed.manifest.chunks[0].status == "submitting"
+    resumed.step()
+    chunk = resumed.manifest.chunks[0]
+    assert chunk.status == "submitted" and chunk.batch_id
+    assert len(batches.list(limit=100).data) == before, "恢复后重复提交了批次"
+
+
+def _prefetcher(calls, **kwargs):
+    """记录每次预取参数的预取管理器（生成函数不访问平台）"""
+    from luminlex.prefetch import PrefetchManager
+
+    def generate(**params):
+        calls.append(params)
+        time.sleep(0.02)
+        return params
+
+    return PrefetchManager(generate_fn=generate, debounce_seconds=0.05, **kwargs)
+
+
+@check
+def prefetch_switch_back_keeps_pending_prefetch():
+    """防抖期间切换回已在预取的选项时，取消其他选项的等待，之前的预取仍可取出"""
+    calls = []
+    prefetcher = _prefetcher(calls)
+    a, b = {"subtype": "a"}, {"subtype": "b"}
+    prefetcher.observe("s", a)
+    time.sleep(0.1)
+    prefetcher.observe("s", b)
+    prefetcher.observe("s", a)
+    time.sleep(0.15)
+    assert calls == [a], calls
+    assert prefetcher.take("s", a) == a
+    stats = prefetcher.stats()
+    assert stats["wasted"] == 0 and stats["hits"] == 1, stats
+
+
+@check
+def prefetch_debounce_and_session_budget():
+    """选项稳定 debounce_seconds 后才预取，每个会话在时间窗口内的预取次数不超过预算"""
+    calls = []
+    prefetcher = _prefetcher(calls, session_budget=2)
+    for subtype in "abcde":
+        prefetcher.observe("s", {"subtype": subtype})
+    time.sleep(0.1)
+    assert calls == [{"subtype": "e"}], "选项变化期间不应预取"
+    for subtype in "fg":
+        prefetcher.observe("s", {"subtype": subtype})
+        time.sleep(0.1)
+    stats = prefetcher.stats()
+    assert len(calls) == 2 and stats["skipped_budget"] == 1, stats
+    # 其他会话的预算不受影响
+    prefetcher.observe("t", {"subtype": "a"})
+    time.sleep(0.1)
+    assert len(calls) == 3
+
+
+@check
+def speculative_requests_leave_reserved_tokens():
+    """预取的平台请求不使用保留给真实请求的令牌"""
+    from luminlex.shared_state import MemoryState
+    state = MemoryState()
+    rate = 4 / 60.0
+    # 容量 4、保留 2：预取只能取到 2 个令牌，真实请求仍能取到剩下的 2 个
+    assert [state.acquire_token("b", 4, rate, 2) == 0 for _ in range(3)] == [True, True, False]
+    assert [state.acquire_token("b", 4, rate) == 0 for _ in range(3)] == [True, True, False]
+
+
+def main():
+    from soak_test import start_fake_provider
+
+    data_dir = tempfile.mkdtemp(prefix="luminlex-check-")
+    base_url = start_fake_provider(0.0, 0.0, 0.0)
+    for name in list(os.environ):
+        if name.endswith("_API_KEY"):
+            del os.environ[name]
+    os.environ.update({
+        "LUMINLEX_DATA_DIR": data_dir,
+        "LUMINLEX_STATE_URL": "memory://",
+        "LUMINLEX_DEEPSEEK_API_KEY": "fake",
+        "LUMINLEX_DEEPSEEK_BASE_URL": base_url,
+    })
+    # 题目集等文件写到临时目录
+    os.chdir(data_dir)
+
+    from luminlex import config
+    config.set_sources([config.EnvSource()])
+
+    failures = []
+    for fn in CHECKS:
+        try:
+            fn()
+        except Exception:
+            failures.append(fn.__name__)
+            print(f"失败: {fn.__name__}（{fn.__doc__}）")
+            traceback.print_exc()
+        else:
+            print(f"通过: {fn.__name__}")
+
+    print(f"{len(CHECKS) - len(failures)}/{len(CHECKS)} 项通过")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
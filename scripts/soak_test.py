@@ -0,0 +1,365 @@
+"""
+多会话长时间压力测试
+
+用 Streamlit 的 AppTest 同时驱动数百个首页会话，对本地模拟平台（scripts/fake_provider.py）生成题目，
+按模拟时间推进：每个会话按真实的操作习惯（修改选项、生成、重新生成、加载历史、重新生成解析）
+间隔若干秒操作一次，会话存活一段时间后离开，由新会话补上。模拟时间不实际等待，几个小时的使用
+可以在几分钟内跑完；预取、会话过期和限流都使用模拟时钟。
+
+每隔一段模拟时间记录一次：
+- 每个会话的 session_state 占用（均值、最大值）
+- 进程 RSS
+- 各类型存活对象数（gc 可追踪的对象），用于发现泄漏的类型
+- 交互耗时（每次 AppTest 整页运行）的 p50 / p95 / p99
+
+预热阶段之后 RSS 增长、单会话占用或某类对象数增长超过阈值时，或页面出现异常、
+显示错误（st.error，如"重新生成失败"）时以非零状态退出。
+
+用法：
+    python scripts/soak_test.py [--sessions 200] [--hours 2] [--think-seconds 45]
+"""
+import argparse
+import functools
+import gc
+import heapq
+import logging
+import os
+import random
+import resource
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import Counter, defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+APP_PATH = os.path.join(ROOT, "streamlit_app.py")
+
+# 首页在 session_state 中保存的内容
+SESSION_KEYS = ["current_question", "question_history", "session_id", "generation_message"]
+
+
+class SimClock:
+    """模拟时钟：sleep 只推进时间，不实际等待"""
+
+    def __init__(self):
+        self._offset = 0.0
+        self._lock = threading.Lock()
+        self._start_wall = time.time()
+        self._start_monotonic = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return self._offset
+
+    def advance_to(self, elapsed: float):
+        with self._lock:
+            self._offset = max(self._offset, elapsed)
+
+    def monotonic(self) -> float:
+        return self._start_monotonic + self._offset
+
+    def time(self) -> float:
+        return self._start_wall + self._offset
+
+    def sleep(self, seconds: float):
+        with self._lock:
+            self._offset += max(0.0, seconds)
+
+    def module(self) -> types.SimpleNamespace:
+        """替换模块中 time 的对象"""
+        return types.SimpleNamespace(monotonic=self.monotonic, time=self.time, sleep=self.sleep,
+                                     perf_counter=time.perf_counter, strftime=time.strftime)
+
+
+def start_fake_provider(latency: float, quirk_rate: float, invalid_rate: float) -> str:
+    """在后台线程中启动模拟平台，返回 base_url"""
+    import uvicorn
+    from fake_provider import FakeProvider, create_app
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    provider = FakeProvider(latency=latency, quirk_rate=quirk_rate, invalid_rate=invalid_rate)
+    server = uvicorn.Server(uvicorn.Config(create_app(provider), host="127.0.0.1", port=port,
+                                           log_level="warning", access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}/v1"
+
+
+def rss_mb() -> float:
+    """当前 RSS（Linux 读取 /proc，其他平台退回到峰值 RSS）"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def deep_size(obj) -> int:
+    """对象及其引用的对象（不含模块、类型、函数）的总大小"""
+    seen = set()
+    stack = [obj]
+    total = 0
+    skip = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType)
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, skip):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        stack.extend(gc.get_referents(current))
+    return total
+
+
+def session_size(at) -> int:
+    state = {}
+    for key in SESSION_KEYS:
+        try:
+            state[key] = at.session_state[key]
+        except KeyError:
+            pass
+    return deep_size(state)
+
+
+def object_counts() -> Counter:
+    gc.collect()
+    return Counter(type(obj).__qualname__ for obj in gc.get_objects())
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+class Session:
+    """一个模拟用户"""
+
+    def __init__(self, at, rng: random.Random, leave_at: float):
+        self.at = at
+        self.rng = rng
+        self.leave_at = leave_at
+        self.actions = 0
+
+    def button(self, prefix):
+        for b in self.at.button:
+            if b.label.startswith(prefix) and not b.disabled:
+                return b
+        return None
+
+    def act(self) -> str:
+        """按权重选择一次操作并执行，返回操作名称"""
+        at = self.at
+        has_question = self.button("🔄") is not None
+        choices = [("修改选项", 35), ("生成题目", 30)]
+        if has_question:
+            choices += [("重新生成", 12), ("重新生成解析", 5)]
+        if self.button("重新加载") is not None:
+            choices.append(("加载历史", 8))
+        name = self.rng.choices([c for c, _ in choices], weights=[w for _, w in choices])[0]
+
+        if name == "修改选项":
+            index = self.rng.randrange(4)
+            box = at.selectbox[index]
+            box.select(self.rng.choice(box.options)).run()
+        elif name == "生成题目":
+            self.button("✨").click().run()
+        elif name == "重新生成":
+            self.button("🔄").click().run()
+            self.button("✨").click().run()
+        elif name == "重新生成解析":
+            self.button("📝").click().run()
+        else:
+            reload_buttons = [b for b in at.button if b.label.startswith("重新加载")]
+            self.rng.choice(reload_buttons).click().run()
+        self.actions += 1
+        return name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多会话长时间压力测试")
+    parser.add_argument("--sessions", type=int, default=200, help="同时在线的会话数")
+    parser.add_argument("--hours", type=float, default=2.0, help="模拟时长（小时）")
+    parser.add_argument("--think-seconds", type=float, default=45.0, help="两次操作之间的平均间隔（模拟秒）")
+    parser.add_argument("--session-minutes", type=float, default=20.0, help="会话平均存活时间（模拟分钟）")
+    parser.add_argument("--checkpoint-minutes", type=float, default=10.0, help="记录间隔（模拟分钟）")
+    parser.add_argument("--warmup-fraction", type=float, default=0.25, help="预热阶段占总时长的比例，之后才检查增长")
+    parser.add_argument("--provider-latency", type=float, default=0.0, help="模拟平台的响应延迟（真实秒）")
+    parser.add_argument("--quirk-rate", type=float, default=0.2)
+    parser.add_argument("--invalid-rate", type=float, default=0.05)
+    parser.add_argument("--max-rss-growth-mb", type=float, default=64.0)
+    parser.add_argument("--max-session-kb", type=float, default=512.0)
+    parser.add_argument("--max-object-growth", type=int, default=20000, help="单一类型存活对象数的最大增长")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # 环境在导入 luminlex 之前设置：只使用模拟平台，数据写到临时目录
+    data_dir = tempfile.mkdtemp(prefix="luminlex-soak-")
+    base_url = start_fake_provider(args.provider_latency, args.quirk_rate, args.invalid_rate)
+    for name in list(os.environ):
+        if name.endswith("_API_KEY"):
+            del os.environ[name]
+    os.environ.update({
+        "LUMINLEX_DATA_DIR": data_dir,
+        # 共享状态和真实部署一样放在 SQLite 文件中，题目库只在进程内缓存最近使用的题目
+        "LUMINLEX_STATE_URL": "sqlite:///" + os.path.join(data_dir, "shared_state.sqlite3"),
+        "LUMINLEX_DEEPSEEK_API_KEY": "fake",
+        "LUMINLEX_DEEPSEEK_BASE_URL": base_url,
+    })
+
+    from streamlit.testing.v1 import AppTest
+    try:
+        # 每个新的 AppTest 都会扫描已安装包中的组件清单（约 1 秒），真实服务只在启动时扫描一次
+        from streamlit.components.v2 import manifest_scanner
+        manifest_scanner.scan_component_manifests = functools.lru_cache(maxsize=1)(
+            manifest_scanner.scan_component_manifests)
+    except ImportError:
+        pass
+    from luminlex import api_utils, config, shared_state
+    import luminlex.prefetch as prefetch
+    from luminlex.question_store import question_store
+
+    config.set_sources([config.EnvSource()])
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("uvicorn.access").disabled = True
+    clock = SimClock()
+    for module in (prefetch, shared_state, api_utils):
+        module.time = clock.module()
+    # 模拟的操作间隔远大于防抖时间，选项变化后直接开始预取
+    prefetch.prefetcher.debounce_seconds = 0
+
+    rng = random.Random(args.seed)
+    total_seconds = args.hours * 3600
+    warmup_seconds = total_seconds * args.warmup_fraction
+    checkpoint_seconds = args.checkpoint_minutes * 60
+
+    sessions = {}
+    queue = []
+    next_id = 0
+
+    def open_session(now):
+        nonlocal next_id
+        at = AppTest.from_file(APP_PATH, default_timeout=60)
+        at.run()
+        session = Session(at, random.Random(rng.random()), now + rng.expovariate(1 / (args.session_minutes * 60)))
+        sessions[next_id] = session
+        heapq.heappush(queue, (now + rng.expovariate(1 / args.think_seconds), next_id))
+        next_id += 1
+
+    for _ in range(args.sessions):
+        open_session(0.0)
+
+    latencies = defaultdict(list)
+    window = []
+    errors = Counter()
+    checkpoints = []
+    baseline_counts = None
+    next_checkpoint = checkpoint_seconds
+    started = time.perf_counter()
+
+    print(f"{'模拟时间':>8}{'会话':>7}{'累计会话':>9}{'RSS MB':>9}{'会话KB均值':>12}{'会话KB最大':>12}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+
+    while queue:
+        now, sid = heapq.heappop(queue)
+        if now >= next_checkpoint or now >= total_seconds:
+            sizes = [session_size(s.at) / 1024 for s in sessions.values()]
+            counts = object_counts()
+            checkpoint = {
+                "minutes": next_checkpoint / 60,
+                "sessions": len(sessions),
+                "opened": next_id,
+                "rss": rss_mb(),
+                "session_kb_mean": statistics.mean(sizes) if sizes else 0.0,
+                "session_kb_max": max(sizes) if sizes else 0.0,
+                "counts": counts,
+                "stored": len(question_store),
+            }
+            checkpoints.append(checkpoint)
+            if baseline_counts is None and next_checkpoint >= warmup_seconds:
+                baseline_counts = checkpoint
+            print(f"{checkpoint['minutes']:>7.0f}m{checkpoint['sessions']:>7}{checkpoint['opened']:>9}"
+                  f"{checkpoint['rss']:>9.1f}{checkpoint['session_kb_mean']:>12.1f}{checkpoint['session_kb_max']:>12.1f}"
+                  f"{percentile(window, 0.5):>9.1f}{percentile(window, 0.95):>9.1f}{percentile(window, 0.99):>9.1f}")
+            window = []
+            next_checkpoint += checkpoint_seconds
+            if now >= total_seconds:
+                break
+
+        clock.advance_to(now)
+        session = sessions[sid]
+        if now >= session.leave_at:
+            # 用户离开，由新会话补上（Streamlit 中会话对象随之释放）
+            del sessions[sid]
+            open_session(now)
+            continue
+
+        start = time.perf_counter()
+        try:
+            action = session.act()
+        except Exception as e:
+            action = "出错"
+            errors[f"{type(e).__name__}: {e}"[:120]] += 1
+        elapsed = (time.perf_counter() - start) * 1000
+        latencies[action].append(elapsed)
+        window.append(elapsed)
+        if session.at.exception:
+            errors[str(session.at.exception[0].message)[:120]] += 1
+        # 页面上显示给用户的错误（如"重新生成失败"）同样算作失败
+        for element in session.at.error:
+            errors[str(element.value)[:120]] += 1
+        heapq.heappush(queue, (now + rng.expovariate(1 / args.think_seconds), sid))
+
+    real_seconds = time.perf_counter() - started
+    print(f"\n模拟 {args.hours:g} 小时用时 {real_seconds:.0f}s，共 {next_id} 个会话，"
+          f"{sum(len(v) for v in latencies.values())} 次交互")
+    print(f"\n{'操作':<10}{'次数':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for action, values in sorted(latencies.items()):
+        print(f"{action:<10}{len(values):>8}{percentile(values, 0.5):>9.1f}"
+              f"{percentile(values, 0.95):>9.1f}{percentile(values, 0.99):>9.1f}")
+    print(f"\n预取: {prefetch.prefetcher.stats()}")
+
+    failures = []
+    if errors:
+        print("\n页面错误:")
+        for message, count in errors.most_common(10):
+            print(f"  {count} × {message}")
+        failures.append(f"出现 {sum(errors.values())} 次页面错误")
+
+    if baseline_counts is not None and checkpoints[-1] is not baseline_counts:
+        last = checkpoints[-1]
+        rss_growth = last["rss"] - baseline_counts["rss"]
+        growth = last["counts"] - baseline_counts["counts"]
+        stored = last["stored"] - baseline_counts["stored"]
+        print(f"\n预热后（{baseline_counts['minutes']:.0f}m 起）RSS 增长 {rss_growth:.1f}MB，"
+              f"题目库新增 {stored} 道题")
+        print("存活对象增长最多的类型:")
+        for name, count in growth.most_common(10):
+            print(f"  {name}: +{count}")
+        if rss_growth > args.max_rss_growth_mb:
+            failures.append(f"RSS 增长 {rss_growth:.1f}MB 超过 {args.max_rss_growth_mb:g}MB")
+        grown = [(name, count) for name, count in growth.items() if count > args.max_object_growth]
+        if grown:
+            failures.append("存活对象增长过多: " + ", ".join(f"{name} +{count}" for name, count in grown))
+    session_max = max(c["session_kb_max"] for c in checkpoints) if checkpoints else 0.0
+    if session_max > args.max_session_kb:
+        failures.append(f"单会话 session_state 最大 {session_max:.0f}KB 超过 {args.max_session_kb:g}KB")
+
+    for failure in failures:
+        print(f"失败: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()